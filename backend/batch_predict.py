@@ -0,0 +1,221 @@
+# backend/batch_predict.py
+# Offline batch prediction over a directory, glob or file list.
+#
+#   python batch_predict.py data/images --out results --outputs mask overlay
+#   python batch_predict.py "data/**/*.jpg" @more_files.txt --batch-size 16
+#
+# Images are decoded in a thread pool, run through the model in batches, and
+# each batch's outputs are written as soon as it finishes. Inputs whose
+# outputs already exist are skipped, so an interrupted run can be resumed.
+import os
+import glob
+import json
+import time
+import argparse
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import torch
+from PIL import Image
+from tqdm import tqdm
+
+from predict import (
+    INPUT_SIZE, init_model, preprocess, predict_batch, prob_map, threshold_map, render,
+    OUTPUTS, NEEDS_ORIGINAL,
+)
+from instances import MIN_AREA
+from runtime import PRECISIONS
+from tiling import run_tiled_prob
+from cascade import run_cascade_prob
+from utils import decode_image
+
+IMAGE_EXTS = ('.png', '.jpg', '.jpeg')
+
+
+def collect_inputs(specs):
+    """
+    specs: directories, glob patterns, image paths, or @file.txt lists
+    (one path per line). Returns a sorted, de-duplicated list of paths.
+    """
+    paths = []
+    for spec in specs:
+        if spec.startswith("@"):
+            with open(spec[1:]) as f:
+                paths.extend(line.strip() for line in f if line.strip())
+        elif os.path.isdir(spec):
+            paths.extend(
+                os.path.join(spec, f) for f in os.listdir(spec)
+                if f.lower().endswith(IMAGE_EXTS)
+            )
+        elif glob.has_magic(spec):
+            paths.extend(glob.glob(spec, recursive=True))
+        else:
+            paths.append(spec)
+    return sorted(set(paths))
+
+
+def input_root(paths):
+    """Deepest directory holding every input; outputs mirror the layout below it."""
+    return os.path.commonpath([os.path.dirname(os.path.abspath(p)) for p in paths])
+
+
+def output_paths(path, root, out_dir, outputs):
+    # a/img01.jpg and b/img01.jpg -> out/a/img01_mask.png, out/b/img01_mask.png;
+    # inputs from a single directory stay flat, as <stem>_<output>.png
+    stem = os.path.splitext(os.path.relpath(os.path.abspath(path), root))[0]
+    return {
+        kind: os.path.join(out_dir, f"{stem}_{kind}.{'json' if kind == 'instances' else 'png'}")
+        for kind in outputs
+    }
+
+
+def load(path, letterboxed=True, full=True):
+    # full=False: reduced JPEG decode, enough for the model input only
+    # (original is then None; meta still maps back to full resolution)
+    original, size = decode_image(path, None if full else INPUT_SIZE)
+    if not letterboxed:
+        return original, None, None
+    return (original if full else None, *preprocess(original, orig_size=size))
+
+
+def save(original, prob, targets, threshold, min_area, contours):
+    mask = threshold_map(prob, threshold)
+    for kind, out in render(original, mask, targets, prob, min_area, contours).items():
+        # write-then-rename: a half-written file never counts as done on resume
+        dst = targets[kind]
+        tmp = dst + ".tmp"
+        if kind == "instances":
+            with open(tmp, "w") as f:
+                json.dump({"threshold": threshold, "min_area": min_area,
+                           "size": [mask.shape[1], mask.shape[0]], "instances": out}, f)
+        else:
+            Image.fromarray(out).save(tmp, format="PNG")
+        os.replace(tmp, dst)
+
+
+def batches(paths, pool, batch_size, letterboxed=True, full=True):
+    """Yields lists of (path, original, letterboxed, meta), keeping ~2 batches decoding ahead."""
+    pending = deque()
+    it = iter(paths)
+
+    def fill():
+        while len(pending) < 2 * batch_size:
+            path = next(it, None)
+            if path is None:
+                return
+            pending.append((path, pool.submit(load, path, letterboxed, full)))
+
+    fill()
+    while pending:
+        batch = []
+        while pending and len(batch) < batch_size:
+            path, fut = pending.popleft()
+            try:
+                batch.append((path, *fut.result()))
+            except Exception as e:
+                print(f"⚠️ skipping {path}: {e}")
+        fill()
+        if batch:
+            yield batch
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("inputs", nargs="+", help="directories, globs, files or @list.txt")
+    parser.add_argument("--weights", default=os.path.join("weights", "sinet.pth"))
+    parser.add_argument("--precision", choices=PRECISIONS, default="fp32",
+                        help="int8 expects --weights to be a quantize.py artifact")
+    parser.add_argument("--out", default="predictions")
+    parser.add_argument("--outputs", nargs="+", choices=OUTPUTS, default=["mask"])
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--workers", type=int, default=4, help="decode/encode threads")
+    parser.add_argument("--threshold", type=float, default=0.5)
+    parser.add_argument("--min-area", type=int, default=MIN_AREA,
+                        help="instances/bounding_box: drop components below this many px")
+    parser.add_argument("--contours", action="store_true", help="instances: include polygons")
+    parser.add_argument("--tile", type=int, default=0,
+                        help="tiled inference with this tile size (px); 0 = one letterboxed pass")
+    parser.add_argument("--overlap", type=int, default=64, help="tile overlap (px)")
+    parser.add_argument("--cascade", type=int, default=0,
+                        help="coarse-to-fine: refine candidate regions, at most this many forwards per image; 0 = off")
+    parser.add_argument("--overwrite", action="store_true", help="don't skip finished inputs")
+    args = parser.parse_args()
+
+    if args.tile and args.cascade:
+        parser.error("--tile and --cascade are mutually exclusive")
+
+    paths = collect_inputs(args.inputs)
+    if not paths:
+        print("⚠️ no input images found")
+        return
+
+    root = input_root(paths)
+    targets = {path: output_paths(path, root, args.out, args.outputs) for path in paths}
+    # e.g. img01.jpg next to img01.png: both would write (and skip on) the same files
+    owners = {}
+    for path, t in targets.items():
+        dst = next(iter(t.values()))
+        if dst in owners:
+            parser.error(f"{owners[dst]} and {path} would both be written to {dst}")
+        owners[dst] = path
+
+    todo = []
+    for path in paths:
+        if args.overwrite or not all(os.path.exists(p) for p in targets[path].values()):
+            todo.append(path)
+    for d in {os.path.dirname(p) for path in todo for p in targets[path].values()}:
+        os.makedirs(d, exist_ok=True)
+    print(f"📌 {len(paths)} inputs, {len(paths) - len(todo)} already done, {len(todo)} to run")
+    if not todo:
+        return
+
+    model = init_model(args.weights, precision=args.precision)
+
+    t0 = time.perf_counter()
+    done = 0
+    with ThreadPoolExecutor(args.workers) as decode_pool, \
+            ThreadPoolExecutor(args.workers) as encode_pool:
+        writes = []
+        pbar = tqdm(total=len(todo), unit="img")
+        whole = bool(args.tile or args.cascade)  # full-resolution input, no letterbox
+        full = whole or bool(NEEDS_ORIGINAL.intersection(args.outputs))
+        for batch in batches(todo, decode_pool, args.batch_size, not whole, full):
+            if args.tile:
+                # tiles of each image are batched inside run_tiled_prob
+                probs = [
+                    run_tiled_prob(model, original, args.tile, args.overlap, args.batch_size)
+                    for _, original, _, _ in batch
+                ]
+            elif args.cascade:
+                # candidate crops of each image are batched inside run_cascade_prob
+                probs = [
+                    run_cascade_prob(model, original, args.cascade, args.batch_size)[0]
+                    for _, original, _, _ in batch
+                ]
+            else:
+                with torch.no_grad():
+                    cis = predict_batch(model, np.stack([img for _, _, img, _ in batch]))
+                # full-resolution probability maps, aligned with the original images
+                probs = [prob_map(ci, meta) for (_, _, _, meta), ci in zip(batch, cis)]
+
+            # only let one batch of writes queue up behind the model
+            for w in writes:
+                w.result()
+            writes = [
+                encode_pool.submit(save, original, prob, targets[path],
+                                   args.threshold, args.min_area, args.contours)
+                for (path, original, _, _), prob in zip(batch, probs)
+            ]
+            done += len(batch)
+            pbar.update(len(batch))
+        for w in writes:
+            w.result()
+        pbar.close()
+
+    elapsed = time.perf_counter() - t0
+    print(f"✅ {done} images in {elapsed:.1f}s ({done / elapsed:.1f} images/sec) -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
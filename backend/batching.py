@@ -0,0 +1,158 @@
+# backend/batching.py
+import asyncio
+import queue
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import Future, InvalidStateError
+
+import numpy as np
+import torch
+
+
+def _resolve(setter, value):
+    # a future that is already done must not take the worker thread down
+    try:
+        setter(value)
+    except InvalidStateError:
+        pass
+
+
+class MicroBatcher:
+    """
+    Dynamic micro-batching in front of the model.
+
+    Single-image requests are queued and gathered for at most `max_wait_ms`
+    (or until `max_batch_size` is reached), stacked into one batch and run
+    through `forward_fn` on a worker thread. Each caller gets back its own
+    slice of the output.
+
+    forward_fn: callable taking a stacked [B,...] tensor of submitted
+    samples and returning a [B,...] tensor
+    """
+    def __init__(self, forward_fn, max_batch_size=8, max_wait_ms=10, wait_window=1024):
+        self.forward_fn = forward_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+
+        self._queue = queue.Queue()
+        self._stop = threading.Event()
+
+        # stats
+        self._lock = threading.Lock()
+        self._batch_sizes = Counter()
+        self._waits = deque(maxlen=wait_window)
+        self._requests = 0
+
+        self._thread = threading.Thread(target=self._loop, name="micro-batcher", daemon=True)
+        self._thread.start()
+
+    # ------------------ PUBLIC API ------------------
+
+    def submit(self, tensor):
+        """
+        tensor: one preprocessed sample (same shape for every request)
+        returns: concurrent.futures.Future resolving to this image's output slice
+        """
+        if self._stop.is_set():
+            raise RuntimeError("MicroBatcher is closed")
+        fut = Future()
+        self._queue.put((tensor, fut, time.perf_counter()))
+        return fut
+
+    async def infer(self, tensor):
+        """Awaitable version of submit() for async handlers."""
+        return await asyncio.wrap_future(self.submit(tensor))
+
+    def close(self, timeout=None):
+        self._stop.set()
+        self._queue.put(None)  # wake the worker
+        self._thread.join(timeout)
+
+    def stats(self):
+        with self._lock:
+            waits_ms = np.array(self._waits, dtype=np.float64) * 1000.0
+            hist = dict(sorted(self._batch_sizes.items()))
+            requests = self._requests
+
+        batches = sum(hist.values())
+        wait = {"mean": 0.0, "p50": 0.0, "p99": 0.0, "max": 0.0}
+        if len(waits_ms):
+            wait = {
+                "mean": float(waits_ms.mean()),
+                "p50": float(np.percentile(waits_ms, 50)),
+                "p99": float(np.percentile(waits_ms, 99)),
+                "max": float(waits_ms.max()),
+            }
+
+        return {
+            "queue_depth": self._queue.qsize(),
+            "requests": requests,
+            "batches": batches,
+            "avg_batch_size": requests / batches if batches else 0.0,
+            "batch_size_histogram": hist,
+            "wait_ms": wait,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+        }
+
+    # ------------------ WORKER ------------------
+
+    def _collect(self):
+        """Block for the first request, then gather more until the deadline."""
+        first = self._queue.get()
+        if first is None:
+            return []
+
+        batch = [first]
+        # deadline counts from when the oldest request was enqueued
+        deadline = first[2] + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                if remaining > 0:
+                    item = self._queue.get(timeout=remaining)
+                else:
+                    # past the deadline: still take whatever is already queued
+                    item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self, batch):
+        # callers that gave up while queued (asyncio.wrap_future cancels the
+        # future with the awaiting task) are dropped before the forward; the
+        # rest are marked running and can no longer be cancelled
+        batch = [item for item in batch if item[1].set_running_or_notify_cancel()]
+        if not batch:
+            return
+        tensors, futures, enqueued = zip(*batch)
+        start = time.perf_counter()
+
+        with self._lock:
+            self._batch_sizes[len(batch)] += 1
+            self._requests += len(batch)
+            self._waits.extend(start - t for t in enqueued)
+
+        try:
+            # grad mode is thread-local, so it has to be disabled here
+            with torch.no_grad():
+                out = self.forward_fn(torch.stack(tensors))
+        except Exception as e:
+            for fut in futures:
+                _resolve(fut.set_exception, e)
+            return
+
+        for i, fut in enumerate(futures):
+            _resolve(fut.set_result, out[i])
+
+    def _loop(self):
+        while True:
+            batch = self._collect()
+            if batch:
+                self._run(batch)
+            if self._stop.is_set() and self._queue.empty():
+                break
@@ -0,0 +1,60 @@
+# backend/bench_backbones.py
+# CPU cost of SINet on each backbone (models/backbones.py): parameters,
+# RF/PDC width derived from the stage widths, and Ci-only latency of the
+# serving module (SINet.inference_module) at batch 1 and per image in a batch.
+# Randomly initialised weights: latency doesn't depend on them.
+#
+#   python bench_backbones.py [--backbones resnet18 mobilenet_v3_large ...]
+#       [--size 352] [--batch 8] [--iters 10]
+import argparse
+
+import torch
+
+from bench_common import time_fn, print_table
+from models.backbones import BACKBONES
+from models.sinet import get_model
+
+
+def measure(backbone, size, batch, iters):
+    model = get_model(pretrained=False, backbone=backbone).eval()
+    net = model.inference_module()
+    x1 = torch.randn(1, 3, size, size)
+    xb = torch.randn(batch, 3, size, size)
+    with torch.no_grad():
+        single = time_fn(lambda: net(x1), warmup=2, iters=iters)
+        batched = time_fn(lambda: net(xb), warmup=1, iters=max(1, iters // 2))
+    return {
+        "backbone": backbone,
+        "params_m": sum(p.numel() for p in net.parameters()) / 1e6,
+        "rf_ch": model.rf1.fuse.out_channels,
+        "b1_ms": single["p50_ms"],
+        "per_img_ms": batched["p50_ms"] / batch,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--backbones", nargs="+", choices=list(BACKBONES), default=list(BACKBONES))
+    parser.add_argument("--size", type=int, default=352)
+    parser.add_argument("--batch", type=int, default=8)
+    parser.add_argument("--iters", type=int, default=10)
+    args = parser.parse_args()
+
+    rows = []
+    for backbone in args.backbones:
+        try:
+            rows.append(measure(backbone, args.size, args.batch, args.iters))
+        except ImportError as e:
+            print(f"⚠️ {backbone}: {e}")
+
+    print_table(rows, [
+        ("backbone", "backbone", "s"),
+        ("params_m", "params M", ".2f"),
+        ("rf_ch", "RF ch", "d"),
+        ("b1_ms", "batch 1 ms", ".1f"),
+        ("per_img_ms", f"ms/img @{args.batch}", ".1f"),
+    ])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+# backend/bench_cascade.py
+# Single letterboxed pass vs tiled vs coarse-to-fine cascade on large images:
+# latency, forwards per image and, with ground truth, accuracy (metrics.py).
+#
+#   python bench_cascade.py IMAGES_DIR [--gt GT_DIR] --weights weights/sinet.pth \
+#       [--cascade 5 9 17] [--tile 704] [--max-samples 20]
+import os
+import time
+import argparse
+
+import numpy as np
+import torch
+from PIL import Image
+
+from bench_common import print_table
+from cascade import run_cascade_prob
+from dataset import list_pairs
+from metrics import mae, s_measure, iou
+from predict import init_model, run_inference
+from tiling import run_tiled_prob, tile_starts
+from utils import decode_image
+from batch_predict import collect_inputs
+
+
+def run_mode(model, img, mode, arg):
+    """returns: (uint8 probability map, forwards)"""
+    if mode == "single":
+        return run_inference(model, img, return_prob=True)[1], 1
+    if mode == "tiled":
+        H, W = img.shape[:2]
+        stride = arg - arg // 8
+        forwards = len(tile_starts(max(H, arg), arg, stride)) * len(tile_starts(max(W, arg), arg, stride))
+        return run_tiled_prob(model, img, arg, arg // 8), forwards
+    prob, info = run_cascade_prob(model, img, arg)
+    return prob, info["forwards"]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("image_dir")
+    parser.add_argument("--gt", help="GT mask dir (paired like COD10KDataset)")
+    parser.add_argument("--weights", default=os.path.join("weights", "sinet.pth"))
+    parser.add_argument("--cascade", type=int, nargs="+", default=[5, 9, 17], help="max forwards")
+    parser.add_argument("--tile", type=int, default=704, help="tile size for the tiled baseline; 0 = skip")
+    parser.add_argument("--max-samples", type=int, default=20)
+    args = parser.parse_args()
+
+    if args.gt:
+        images, masks = list_pairs(args.image_dir, args.gt)
+        samples = [(os.path.join(args.image_dir, i), os.path.join(args.gt, m)) for i, m in zip(images, masks)]
+    else:
+        samples = [(p, None) for p in collect_inputs([args.image_dir])]
+    samples = samples[:args.max_samples]
+
+    modes = [("single", None, "single")]
+    if args.tile:
+        modes.append(("tiled", args.tile, f"tiled {args.tile}"))
+    modes += [("cascade", n, f"cascade {n}") for n in args.cascade]
+
+    model = init_model(args.weights)
+    with torch.no_grad():
+        run_inference(model, np.zeros((352, 352, 3), np.uint8))  # warm up
+
+    results = {label: {"ms": [], "forwards": [], "mae": [], "s_measure": [], "iou": []} for _, _, label in modes}
+    for img_path, gt_path in samples:
+        img, _ = decode_image(img_path)
+        gt = np.asarray(Image.open(gt_path).convert("L")) if gt_path else None
+        for mode, arg, label in modes:
+            t0 = time.perf_counter()
+            prob, forwards = run_mode(model, img, mode, arg)
+            r = results[label]
+            r["ms"].append((time.perf_counter() - t0) * 1000.0)
+            r["forwards"].append(forwards)
+            if gt is not None:
+                r["mae"].append(mae(prob, gt))
+                r["s_measure"].append(s_measure(prob, gt))
+                r["iou"].append(iou(prob, gt))
+
+    rows = []
+    for _, _, label in modes:
+        r = results[label]
+        row = {"mode": label, "ms": np.mean(r["ms"]), "forwards": np.mean(r["forwards"])}
+        for k in ("mae", "s_measure", "iou"):
+            row[k] = np.mean(r[k]) if r[k] else float("nan")
+        rows.append(row)
+
+    print(f"📊 {len(samples)} images")
+    print_table(rows, [
+        ("mode", "mode", "s"),
+        ("ms", "ms/img", ".0f"),
+        ("forwards", "forwards", ".1f"),
+        ("mae", "MAE", ".4f"),
+        ("s_measure", "S-measure", ".4f"),
+        ("iou", "IoU", ".4f"),
+    ])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+# backend/bench_common.py
+# Small helpers shared by the bench_*.py scripts.
+import json
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+
+def time_fn(fn, warmup=2, iters=10):
+    """
+    Runs fn() `warmup` times untimed, then `iters` times timed.
+    returns: dict of latency stats in milliseconds
+    """
+    for _ in range(warmup):
+        fn()
+
+    times = []
+    for _ in range(iters):
+        t0 = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - t0) * 1000.0)
+
+    times = np.array(times)
+    return {
+        "mean_ms": float(times.mean()),
+        "p50_ms": float(np.percentile(times, 50)),
+        "min_ms": float(times.min()),
+    }
+
+
+def peak_rss_mb():
+    """High-water mark of this process' resident memory, in MB."""
+    if sys.platform.startswith("linux"):
+        # VmHWM belongs to this process image; ru_maxrss would carry over
+        # the parent's peak across fork/exec
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+
+    if sys.platform == "win32":
+        import psutil
+        return psutil.Process().memory_info().peak_wset / 2**20
+
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 2**20  # macOS: bytes
+
+
+def rss_mb():
+    """Current resident memory of this process, in MB."""
+    if sys.platform.startswith("linux"):
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+
+    import psutil
+    return psutil.Process().memory_info().rss / 2**20
+
+
+def run_isolated(script, *args):
+    """
+    Runs `python script --child args...` in a fresh interpreter and returns
+    the JSON dict it prints on its last stdout line. Peak memory can only be
+    measured cleanly in a process that ran nothing else.
+    """
+    cmd = [sys.executable, script, "--child", *map(str, args)]
+    out = subprocess.run(cmd, check=True, capture_output=True, text=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def print_table(rows, columns):
+    """rows: list of dicts, columns: list of (key, header, fmt)"""
+    widths = [max(len(h), 10) for _, h, _ in columns]
+    print("  ".join(h.rjust(w) for (_, h, _), w in zip(columns, widths)))
+    for row in rows:
+        print("  ".join(
+            format(row[k], fmt).rjust(w) for (k, _, fmt), w in zip(columns, widths)
+        ))
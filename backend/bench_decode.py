@@ -0,0 +1,121 @@
+# backend/bench_decode.py
+# Upload decode cost, full versus reduced-scale JPEG decode
+# (utils.decode_image), up to the letterboxed model input:
+#
+#   full    - full-resolution decode, then letterbox (overlays, tiling)
+#   reduced - libjpeg DCT-domain downscale (PIL draft), then letterbox
+#
+# Each measurement runs in a fresh interpreter so peak memory is its own.
+# Times and peak memory (above the interpreter's baseline) are also given
+# per megapixel of the source. "lb diff" is the mean absolute difference
+# (grey levels) between the two letterboxed model inputs.
+#
+#   python bench_decode.py [--images a.jpg b.jpg] [--megapixels 2 12 24] [--runs 5]
+import os
+import time
+import argparse
+import tempfile
+
+import cv2
+import numpy as np
+
+from bench_common import run_isolated, rss_mb, peak_rss_mb, print_table
+
+MODES = ["full", "reduced"]
+INPUT_SIZE = 352
+
+
+def synthetic_jpeg(path, megapixels, seed=0):
+    # smooth photo-like texture plus sensor-like noise, 4:3
+    rng = np.random.default_rng(seed)
+    w = int(round((megapixels * 1e6 * 4 / 3) ** 0.5))
+    h = int(round(w * 3 / 4))
+    coarse = rng.integers(0, 255, (h // 64 + 1, w // 64 + 1, 3), dtype=np.uint8)
+    img = cv2.resize(coarse, (w, h), interpolation=cv2.INTER_CUBIC)
+    img = cv2.add(img, rng.integers(0, 24, (h, w, 3), dtype=np.uint8))
+    cv2.imwrite(path, img, [cv2.IMWRITE_JPEG_QUALITY, 90])
+
+
+def letterboxed(path, mode):
+    from predict import preprocess
+    from utils import decode_image
+    img, size = decode_image(path, INPUT_SIZE if mode == "reduced" else None)
+    return preprocess(img, orig_size=size)
+
+
+def measure(mode, path, runs):
+    from PIL import Image
+    import predict  # noqa: F401  (imports are not part of the measurement)
+    baseline = rss_mb()
+
+    times = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        letterboxed(path, mode)
+        times.append(time.perf_counter() - t0)
+
+    with Image.open(path) as im:
+        w, h = im.size
+    return {
+        "megapixels": w * h / 1e6,
+        "ms": min(times) * 1000.0,
+        "peak_mb": peak_rss_mb() - baseline,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--images", nargs="+", help="JPEGs to decode (default: synthetic)")
+    parser.add_argument("--megapixels", type=float, nargs="+", default=[2, 12, 24])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--child", nargs=3, metavar=("MODE", "PATH", "RUNS"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        import json
+        mode, path, runs = args.child
+        print(json.dumps(measure(mode, path, int(runs))))
+        return
+
+    tmp = tempfile.TemporaryDirectory()
+    paths = args.images
+    if not paths:
+        paths = []
+        for mp in args.megapixels:
+            path = os.path.join(tmp.name, f"{mp:g}mp.jpg")
+            synthetic_jpeg(path, mp)
+            paths.append(path)
+
+    rows = []
+    try:
+        for path in paths:
+            full_lb, _ = letterboxed(path, "full")
+            reduced_lb, _ = letterboxed(path, "reduced")
+            diff = float(np.abs(full_lb.astype(np.int16) - reduced_lb).mean())
+            for mode in MODES:
+                r = run_isolated(__file__, mode, path, args.runs)
+                rows.append({
+                    "image": os.path.basename(path),
+                    "mode": mode,
+                    **r,
+                    "ms_per_mp": r["ms"] / r["megapixels"],
+                    "mb_per_mp": r["peak_mb"] / r["megapixels"],
+                    "lb_diff": diff if mode == "reduced" else 0.0,
+                })
+    finally:
+        tmp.cleanup()
+
+    print_table(rows, [
+        ("image", "image", "s"),
+        ("mode", "mode", "s"),
+        ("megapixels", "MP", ".1f"),
+        ("ms", "ms", ".1f"),
+        ("ms_per_mp", "ms/MP", ".2f"),
+        ("peak_mb", "peak MB", ".1f"),
+        ("mb_per_mp", "MB/MP", ".2f"),
+        ("lb_diff", "lb diff", ".2f"),
+    ])
+
+
+if __name__ == "__main__":
+    main()
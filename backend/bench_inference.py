@@ -0,0 +1,65 @@
+# backend/bench_inference.py
+# Compares the full training forward (Ci + Cs) with the inference-only
+# SINet.predict (Ci only) for latency and peak memory at several input sizes.
+#
+#   python bench_inference.py [--sizes 352 704 1056] [--iters 10]
+import argparse
+import json
+
+import torch
+
+from bench_common import time_fn, peak_rss_mb, run_isolated, print_table
+from models.sinet import get_model
+
+
+def measure(mode, size, iters):
+    model = get_model(pretrained=False)
+    model.eval()
+    x = torch.randn(1, 3, size, size)
+
+    fn = model if mode == "forward" else model.predict
+    with torch.no_grad():
+        base = peak_rss_mb()
+        stats = time_fn(lambda: fn(x), warmup=1, iters=iters)
+    stats["peak_mb"] = peak_rss_mb() - base
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[352, 704, 1056])
+    parser.add_argument("--iters", type=int, default=10)
+    parser.add_argument("--child", nargs=3, metavar=("MODE", "SIZE", "ITERS"),
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        mode, size, iters = args.child
+        print(json.dumps(measure(mode, int(size), int(iters))))
+        return
+
+    rows = []
+    for size in args.sizes:
+        full = run_isolated(__file__, "forward", size, args.iters)
+        fast = run_isolated(__file__, "predict", size, args.iters)
+        rows.append({
+            "size": size,
+            "forward_ms": full["p50_ms"],
+            "predict_ms": fast["p50_ms"],
+            "speedup": full["p50_ms"] / fast["p50_ms"],
+            "forward_mb": full["peak_mb"],
+            "predict_mb": fast["peak_mb"],
+        })
+
+    print_table(rows, [
+        ("size", "size", "d"),
+        ("forward_ms", "forward ms", ".1f"),
+        ("predict_ms", "predict ms", ".1f"),
+        ("speedup", "speedup", ".2f"),
+        ("forward_mb", "forward +MB", ".0f"),
+        ("predict_mb", "predict +MB", ".0f"),
+    ])
+
+
+if __name__ == "__main__":
+    main()
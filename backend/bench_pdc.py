@@ -0,0 +1,100 @@
+# backend/bench_pdc.py
+# Checks the fused low-resolution PDC path against the original
+# upsample-then-concat path, then compares latency and peak memory of
+# SINet.predict with each.
+#
+#   python bench_pdc.py [--sizes 352 704 1408] [--iters 10]
+import argparse
+import json
+
+import torch
+
+from bench_common import time_fn, peak_rss_mb, run_isolated, print_table
+from models.sinet import get_model
+
+
+def set_fused(model, fused):
+    model.pdc_s.fused = fused
+    model.pdc_i.fused = fused
+
+
+def parity(sizes):
+    torch.manual_seed(0)
+    model = get_model(pretrained=False)
+    model.eval()
+
+    rows = []
+    with torch.no_grad():
+        for size in sizes:
+            x = torch.randn(2, 3, size, size)
+            set_fused(model, False)
+            ref_i, ref_s = model(x)
+            set_fused(model, True)
+            out_i, out_s = model(x)
+            rows.append({
+                "size": size,
+                "ci_diff": (ref_i - out_i).abs().max().item(),
+                "cs_diff": (ref_s - out_s).abs().max().item(),
+            })
+    return rows
+
+
+def measure(mode, size, iters):
+    model = get_model(pretrained=False)
+    model.eval()
+    set_fused(model, mode == "fused")
+    x = torch.randn(1, 3, size, size)
+
+    with torch.no_grad():
+        base = peak_rss_mb()
+        stats = time_fn(lambda: model.predict(x), warmup=1, iters=iters)
+    stats["peak_mb"] = peak_rss_mb() - base
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[352, 704, 1408])
+    parser.add_argument("--iters", type=int, default=10)
+    parser.add_argument("--child", nargs=3, metavar=("MODE", "SIZE", "ITERS"),
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        mode, size, iters = args.child
+        print(json.dumps(measure(mode, int(size), int(iters))))
+        return
+
+    print("Parity (max |concat - fused|):")
+    print_table(parity(args.sizes[:2]), [
+        ("size", "size", "d"),
+        ("ci_diff", "Ci diff", ".2e"),
+        ("cs_diff", "Cs diff", ".2e"),
+    ])
+
+    rows = []
+    for size in args.sizes:
+        concat = run_isolated(__file__, "concat", size, args.iters)
+        fused = run_isolated(__file__, "fused", size, args.iters)
+        rows.append({
+            "size": size,
+            "concat_ms": concat["p50_ms"],
+            "fused_ms": fused["p50_ms"],
+            "speedup": concat["p50_ms"] / fused["p50_ms"],
+            "concat_mb": concat["peak_mb"],
+            "fused_mb": fused["peak_mb"],
+        })
+
+    print("\nSINet.predict latency / peak memory:")
+    print_table(rows, [
+        ("size", "size", "d"),
+        ("concat_ms", "concat ms", ".1f"),
+        ("fused_ms", "fused ms", ".1f"),
+        ("speedup", "speedup", ".2f"),
+        ("concat_mb", "concat +MB", ".0f"),
+        ("fused_mb", "fused +MB", ".0f"),
+    ])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+# backend/bench_precision.py
+# fp32 vs bf16 vs int8 inference: latency (batch 1), throughput (batch 8),
+# model size and mask IoU against the fp32 masks.
+#
+#   python bench_precision.py --weights weights/sinet.pth [--int8 weights/sinet_int8.pt]
+#       [--images DIR] [--calib-images DIR --calib-masks DIR]
+#
+# Without --int8 the model is quantized on the fly (calibrated on
+# --calib-images if given, otherwise on --images / random inputs).
+import io
+import os
+import argparse
+import tempfile
+
+import numpy as np
+import torch
+from PIL import Image
+
+from bench_common import time_fn, print_table
+from models.sinet import load_model
+from predict import preprocess, predict_batch
+from quantize import calibration_batches, quantize_int8, save_quantized
+from runtime import bf16_supported, load_predictor
+from utils import normalize_batch
+
+IMAGE_EXTS = ('.png', '.jpg', '.jpeg')
+
+
+def load_images(image_dir, n):
+    if image_dir is None:
+        rng = np.random.default_rng(0)
+        return [rng.integers(0, 255, (352, 352, 3), dtype=np.uint8) for _ in range(n)]
+    names = sorted(f for f in os.listdir(image_dir) if f.lower().endswith(IMAGE_EXTS))[:n]
+    return [np.asarray(Image.open(os.path.join(image_dir, f)).convert("RGB")) for f in names]
+
+
+def state_size_mb(module):
+    buf = io.BytesIO()
+    torch.save(module.state_dict(), buf)
+    return buf.tell() / 2**20
+
+
+def masks(model, batch):
+    with torch.no_grad():
+        return (predict_batch(model, batch) > 0.5).numpy()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--weights", default=os.path.join("weights", "sinet.pth"))
+    parser.add_argument("--int8", help="quantized artifact from quantize.py")
+    parser.add_argument("--images", help="images to compare masks on (default: random)")
+    parser.add_argument("--calib-images")
+    parser.add_argument("--calib-masks")
+    parser.add_argument("--n", type=int, default=16, help="images for the IoU comparison")
+    parser.add_argument("--iters", type=int, default=10)
+    args = parser.parse_args()
+
+    batch = np.stack([preprocess(img)[0] for img in load_images(args.images, args.n)])
+
+    tmp = None
+    int8_path = args.int8
+    if int8_path is None:
+        if args.calib_images:
+            calib = calibration_batches(args.calib_images, args.calib_masks)
+        else:
+            calib = [normalize_batch(batch[i:i + 8]) for i in range(0, len(batch), 8)]
+        tmp = tempfile.NamedTemporaryFile(suffix=".pt", delete=False)
+        tmp.close()
+        save_quantized(quantize_int8(load_model(args.weights), calib), tmp.name)
+        int8_path = tmp.name
+
+    fp32 = load_model(args.weights)
+    models = {
+        "fp32": (fp32, state_size_mb(fp32.inference_module())),
+        "int8": (load_predictor(int8_path, precision="int8"), os.path.getsize(int8_path) / 2**20),
+    }
+    if bf16_supported():
+        models["bf16"] = (load_predictor(args.weights, precision="bf16"), models["fp32"][1])
+    else:
+        print("bf16: skipped (no native bf16 support on this CPU)")
+
+    ref = masks(fp32, batch)
+    rows = []
+    for name, (model, size) in models.items():
+        one = batch[:1]
+        eight = batch[:8]
+        with torch.no_grad():
+            lat = time_fn(lambda: predict_batch(model, one), iters=args.iters)
+            thr = time_fn(lambda: predict_batch(model, eight), iters=max(1, args.iters // 2))
+
+        pred = masks(model, batch)
+        inter = np.logical_and(pred, ref).sum(axis=(1, 2, 3))
+        union = np.logical_or(pred, ref).sum(axis=(1, 2, 3))
+        iou = np.where(union > 0, inter / np.maximum(union, 1), 1.0).mean()
+
+        rows.append({
+            "precision": name,
+            "latency_ms": lat["p50_ms"],
+            "throughput": len(eight) / (thr["p50_ms"] / 1000.0),
+            "size_mb": size,
+            "iou": float(iou),
+        })
+
+    if tmp is not None:
+        os.remove(tmp.name)
+
+    print_table(rows, [
+        ("precision", "precision", "s"),
+        ("latency_ms", "b1 ms", ".1f"),
+        ("throughput", "b8 img/s", ".1f"),
+        ("size_mb", "size MB", ".1f"),
+        ("iou", "IoU vs fp32", ".4f"),
+    ])
+
+
+if __name__ == "__main__":
+    main()
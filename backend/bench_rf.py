@@ -0,0 +1,92 @@
+# backend/bench_rf.py
+# Per-stage micro-benchmark of RFBlock variants. All of them load the same
+# RFBlock weights, and each one is checked against the original:
+#
+#   baseline      - RFBlock.forward: 4 branch convs over NCHW input, concat, 1x1 fuse
+#   merged        - 1x1 branch folded into the 3x3 branch's centre tap: one
+#                   3x3 conv with 2*out_ch outputs (one read of x fewer, but
+#                   the 1x1 branch now pays for 9 taps)
+#   channels_last - baseline on NHWC weights/activations, as SINetInference runs it
+#
+#   python bench_rf.py [--size 352] [--batch 1] [--iters 20]
+import argparse
+
+import torch
+import torch.nn.functional as F
+
+from bench_common import time_fn, print_table
+from models.sinet import RFBlock
+
+# (name, channels, stride) of the backbone features each RF block sees
+STAGES = [("rf1", 64, 4), ("rf2", 128, 8), ("rf3", 256, 16), ("rf4", 512, 32)]
+
+
+def merged_forward(rf):
+    c1, c2, c3, c4 = rf.b1[0], rf.b2[0], rf.b3[0], rf.b4[0]
+    w12 = torch.cat([F.pad(c1.weight, (1, 1, 1, 1)), c2.weight])
+    b12 = torch.cat([c1.bias, c2.bias])
+
+    def forward(x):
+        y = torch.cat([
+            F.conv2d(x, w12, b12, padding=1),
+            c3(x),
+            c4(x),
+        ], dim=1)
+        return rf.fuse(y.relu_())
+
+    return forward
+
+
+def measure_stage(name, ch, stride, size, batch, iters):
+    torch.manual_seed(0)
+    rf = RFBlock(ch).eval()
+    rf_cl = RFBlock(ch).eval()
+    rf_cl.load_state_dict(rf.state_dict())
+    rf_cl.to(memory_format=torch.channels_last)
+
+    x = torch.randn(batch, ch, size // stride, size // stride)
+    x_cl = x.contiguous(memory_format=torch.channels_last)
+    variants = {
+        "baseline": (rf, x),
+        "merged": (merged_forward(rf), x),
+        "channels_last": (rf_cl, x_cl),
+    }
+
+    row = {"stage": name, "shape": f"{ch}x{size // stride}"}
+    with torch.no_grad():
+        ref = rf(x)
+        for key, (fn, inp) in variants.items():
+            row[f"{key}_ms"] = time_fn(lambda: fn(inp), iters=iters)["p50_ms"]
+            row[f"{key}_diff"] = (fn(inp) - ref).abs().max().item()
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", type=int, default=352, help="network input size")
+    parser.add_argument("--batch", type=int, default=1)
+    parser.add_argument("--iters", type=int, default=20)
+    args = parser.parse_args()
+
+    rows = [measure_stage(name, ch, stride, args.size, args.batch, args.iters)
+            for name, ch, stride in STAGES]
+    for r in rows:
+        r["merged_x"] = r["baseline_ms"] / r["merged_ms"]
+        r["channels_last_x"] = r["baseline_ms"] / r["channels_last_ms"]
+        r["diff"] = max(r["merged_diff"], r["channels_last_diff"])
+
+    print(f"input {args.size}, batch {args.batch}")
+    print_table(rows, [
+        ("stage", "stage", "s"),
+        ("shape", "C x HW", "s"),
+        ("baseline_ms", "baseline ms", ".2f"),
+        ("merged_ms", "merged ms", ".2f"),
+        ("merged_x", "speedup", ".2f"),
+        ("channels_last_ms", "NHWC ms", ".2f"),
+        ("channels_last_x", "speedup", ".2f"),
+        ("diff", "max |diff|", ".1e"),
+    ])
+
+
+if __name__ == "__main__":
+    main()
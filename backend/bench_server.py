@@ -0,0 +1,106 @@
+# backend/bench_server.py
+# In-process load test for /predict: drives server.app through httpx's ASGI
+# transport (no network, no uvicorn) at several concurrency levels and
+# reports latency percentiles, throughput and 503 rejections. Every request
+# posts the same image, so the result cache is turned off
+# (SINET_RESULT_CACHE_MB=0) and each one runs the model.
+#
+#   pip install httpx
+#   python bench_server.py --weights weights/sinet.pth [--image some.jpg]
+#       [--concurrency 1 4 16 64] [--requests 64] [--outputs mask]
+import os
+import io
+import time
+import asyncio
+import argparse
+
+import numpy as np
+from PIL import Image
+
+from bench_common import print_table
+
+
+def sample_image(path=None, size=(1024, 768)):
+    if path:
+        with open(path, "rb") as f:
+            return f.read()
+    rng = np.random.default_rng(0)
+    img = Image.fromarray(rng.integers(0, 255, (size[1], size[0], 3), dtype=np.uint8))
+    buf = io.BytesIO()
+    img.save(buf, format="JPEG", quality=90)
+    return buf.getvalue()
+
+
+async def run_level(client, payload, concurrency, n_requests, outputs):
+    latencies = []
+    status = {}
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with sem:
+            t0 = time.perf_counter()
+            r = await client.post(
+                f"/predict?outputs={outputs}",
+                files={"file": ("image.jpg", payload, "image/jpeg")},
+            )
+            if r.status_code == 200:
+                latencies.append((time.perf_counter() - t0) * 1000.0)
+            status[r.status_code] = status.get(r.status_code, 0) + 1
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(n_requests)))
+    elapsed = time.perf_counter() - t0
+
+    lat = np.array(latencies) if latencies else np.zeros(1)
+    return {
+        "concurrency": concurrency,
+        "ok": status.get(200, 0),
+        "rejected": status.get(503, 0),
+        "p50_ms": float(np.percentile(lat, 50)),
+        "p99_ms": float(np.percentile(lat, 99)),
+        "rps": status.get(200, 0) / elapsed,
+    }
+
+
+async def main_async(args):
+    import httpx
+    import server  # loads the model
+
+    payload = sample_image(args.image)
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        # warm up
+        await run_level(client, payload, 1, 2, args.outputs)
+
+        rows = []
+        for c in args.concurrency:
+            rows.append(await run_level(client, payload, c, max(args.requests, c), args.outputs))
+
+    print_table(rows, [
+        ("concurrency", "conc", "d"),
+        ("ok", "ok", "d"),
+        ("rejected", "503s", "d"),
+        ("p50_ms", "p50 ms", ".1f"),
+        ("p99_ms", "p99 ms", ".1f"),
+        ("rps", "req/s", ".2f"),
+    ])
+    print("\n/stats:", server.stats())
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--weights", help="checkpoint (sets SINET_WEIGHTS)")
+    parser.add_argument("--image", help="image to upload (default: synthetic 1024x768 JPEG)")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--requests", type=int, default=64, help="requests per level")
+    parser.add_argument("--outputs", default="mask")
+    args = parser.parse_args()
+
+    if args.weights:
+        os.environ["SINET_WEIGHTS"] = args.weights
+    os.environ["SINET_RESULT_CACHE_MB"] = "0"  # read when server is imported
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
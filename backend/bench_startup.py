@@ -0,0 +1,155 @@
+# backend/bench_startup.py
+# Measures server cold start: time to import torch, build SINet, load the
+# checkpoint and run the first forward, plus resident memory once ready.
+#
+#   legacy  - ImageNet-initialised backbone, then torch.load the checkpoint
+#             (the old load_model; needs the torch hub cache or network)
+#   no-mmap - no ImageNet init, checkpoint read fully into memory
+#   offline - load_model(): no ImageNet init, memory-mapped checkpoint
+#   torchscript - export.py artifact: no torchvision, no model construction
+#
+#   python bench_startup.py [--weights weights/sinet.pth] [--runs 3]
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from bench_common import rss_mb, peak_rss_mb, run_isolated, print_table
+
+MODES = ["legacy", "no-mmap", "offline", "torchscript"]
+
+
+def measure_scripted(artifact_path):
+    t0 = time.perf_counter()
+    import torch
+    from runtime import load_scripted
+    t_import = time.perf_counter()
+
+    model = load_scripted(artifact_path)
+    t_load = time.perf_counter()
+
+    with torch.no_grad():
+        model.predict(torch.zeros(1, 3, 352, 352))
+    t_ready = time.perf_counter()
+
+    return {
+        "import_s": t_import - t0,
+        "build_s": 0.0,
+        "load_s": t_load - t_import,
+        "forward_s": t_ready - t_load,
+        "total_s": t_ready - t0,
+        "rss_mb": rss_mb(),
+        "peak_mb": peak_rss_mb(),
+    }
+
+
+def measure(mode, weights_path):
+    if mode == "torchscript":
+        return measure_scripted(weights_path)
+
+    t0 = time.perf_counter()
+    import torch
+    from models.sinet import get_model, load_checkpoint
+    t_import = time.perf_counter()
+
+    model = get_model(pretrained=(mode == "legacy"))
+    t_build = time.perf_counter()
+
+    # same steps as load_model(), split so build and load are timed apart
+    if mode == "offline":
+        ckpt = load_checkpoint(weights_path)
+    else:
+        ckpt = torch.load(weights_path, map_location="cpu")
+    model.load_state_dict(ckpt["state_dict"])
+    model.eval()
+    del ckpt
+    t_load = time.perf_counter()
+
+    with torch.no_grad():
+        model.predict(torch.zeros(1, 3, 352, 352))
+    t_ready = time.perf_counter()
+
+    return {
+        "import_s": t_import - t0,
+        "build_s": t_build - t_import,
+        "load_s": t_load - t_build,
+        "forward_s": t_ready - t_load,
+        "total_s": t_ready - t0,
+        "rss_mb": rss_mb(),
+        "peak_mb": peak_rss_mb(),
+    }
+
+
+def make_checkpoint(path):
+    import torch
+    from models.sinet import get_model
+    model = get_model(pretrained=False)
+    torch.save({"state_dict": model.state_dict()}, path)
+
+
+def make_artifact(weights_path, path):
+    import torch
+    from export import compile_model
+    from models.sinet import load_model
+    with torch.no_grad():
+        torch.jit.save(compile_model(load_model(weights_path)), path)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--weights", default=None,
+                        help="checkpoint to load (default: a randomly initialised one)")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--child", nargs=2, metavar=("MODE", "WEIGHTS"),
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        mode, weights_path = args.child
+        print(json.dumps(measure(mode, weights_path)))
+        return
+
+    tmp = None
+    weights_path = args.weights
+    if weights_path is None:
+        tmp = tempfile.NamedTemporaryFile(suffix=".pth", delete=False)
+        tmp.close()
+        make_checkpoint(tmp.name)
+        weights_path = tmp.name
+
+    artifact = tempfile.NamedTemporaryFile(suffix=".pt", delete=False)
+    artifact.close()
+    make_artifact(weights_path, artifact.name)
+
+    rows = []
+    try:
+        for mode in MODES:
+            path = artifact.name if mode == "torchscript" else weights_path
+            try:
+                runs = [run_isolated(__file__, mode, path) for _ in range(args.runs)]
+            except Exception:
+                print(f"{mode}: failed (ImageNet weights not cached / no network?)")
+                continue
+            # best-of-N: cold start is noisy, the minimum is the most repeatable
+            best = min(runs, key=lambda r: r["total_s"])
+            rows.append({"mode": mode, **best})
+    finally:
+        if tmp is not None:
+            os.remove(tmp.name)
+        os.remove(artifact.name)
+
+    print_table(rows, [
+        ("mode", "mode", "s"),
+        ("import_s", "import s", ".2f"),
+        ("build_s", "build s", ".2f"),
+        ("load_s", "load s", ".2f"),
+        ("forward_s", "1st fwd s", ".2f"),
+        ("total_s", "total s", ".2f"),
+        ("rss_mb", "RSS MB", ".0f"),
+        ("peak_mb", "peak MB", ".0f"),
+    ])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+# backend/bench_tta.py
+# Accuracy vs latency of each test-time augmentation preset on a labelled
+# COD10K-style split (images + GT masks).
+#
+#   python bench_tta.py IMAGES_DIR GT_DIR --weights weights/sinet.pth [--max-samples 100]
+import os
+import time
+import argparse
+
+import numpy as np
+import torch
+from PIL import Image
+
+from bench_common import print_table
+from dataset import list_pairs
+from predict import init_model, preprocess, predict_batch
+from tta import TTA_PRESETS
+from utils import unletterbox
+
+
+def evaluate(model, samples, preset, threshold=0.5):
+    ious, maes, times = [], [], []
+    for img, gt in samples:
+        lb, meta = preprocess(img)
+        t0 = time.perf_counter()
+        with torch.no_grad():
+            prob = predict_batch(model, lb[None], preset)
+        times.append((time.perf_counter() - t0) * 1000.0)
+
+        prob = unletterbox(prob[0], meta)
+        pred = prob > threshold
+        union = np.logical_or(pred, gt).sum()
+        ious.append(np.logical_and(pred, gt).sum() / union if union else 1.0)
+        maes.append(np.abs(prob - gt).mean())
+
+    return {
+        "preset": preset,
+        "views": len(TTA_PRESETS[preset]["scales"]) * (2 if TTA_PRESETS[preset]["flip"] else 1),
+        "iou": float(np.mean(ious)),
+        "mae": float(np.mean(maes)),
+        "ms": float(np.median(times)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("image_dir")
+    parser.add_argument("mask_dir")
+    parser.add_argument("--weights", default=os.path.join("weights", "sinet.pth"))
+    parser.add_argument("--presets", nargs="+", choices=list(TTA_PRESETS), default=list(TTA_PRESETS))
+    parser.add_argument("--max-samples", type=int, default=100)
+    args = parser.parse_args()
+
+    images, masks = list_pairs(args.image_dir, args.mask_dir)
+    samples = []
+    for img_name, mask_name in list(zip(images, masks))[:args.max_samples]:
+        img = np.asarray(Image.open(os.path.join(args.image_dir, img_name)).convert("RGB"))
+        gt = np.asarray(Image.open(os.path.join(args.mask_dir, mask_name)).convert("L")) > 127
+        samples.append((img, gt))
+
+    model = init_model(args.weights)
+    evaluate(model, samples[:1], "none")  # warm up
+
+    rows = [evaluate(model, samples, preset) for preset in args.presets]
+    base = rows[0]["ms"]
+    for r in rows:
+        r["cost"] = r["ms"] / base
+
+    print(f"{len(samples)} images, threshold 0.5")
+    print_table(rows, [
+        ("preset", "preset", "s"),
+        ("views", "views", "d"),
+        ("iou", "IoU", ".4f"),
+        ("mae", "MAE", ".4f"),
+        ("ms", "ms/img", ".1f"),
+        ("cost", "x latency", ".2f"),
+    ])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+# backend/bench_workers.py
+# Memory and throughput versus worker count, for the two multi-process modes:
+#
+#   prefork - serve.py: model loaded once, workers forked and sharing it
+#   uvicorn - `uvicorn server:app --workers N`: every worker loads its own copy
+#
+# Each configuration is started as a real server on a free local port and
+# loaded over HTTP once all its workers report startup complete. Memory is
+# summed over the whole process tree: RSS counts shared pages once per
+# process, PSS splits them between the processes sharing them, so the PSS
+# total is what the machine actually spends. Linux only (/proc).
+#
+#   pip install httpx
+#   python bench_workers.py --weights weights/sinet.pth [--workers 1 2 4]
+#       [--modes prefork uvicorn] [--requests 64]
+import os
+import sys
+import time
+import signal
+import socket
+import asyncio
+import argparse
+import threading
+import subprocess
+
+import numpy as np
+
+from bench_common import print_table
+from bench_server import sample_image
+
+READY = "Application startup complete."  # uvicorn logs this once per worker
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def children(pid):
+    kids = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                stat = f.read()
+        except OSError:
+            continue
+        # field 4 is the parent pid; the name (field 2) may contain spaces
+        if int(stat.rsplit(")", 1)[1].split()[1]) == pid:
+            kids.append(int(entry))
+    return kids
+
+
+def tree_memory_mb(pid):
+    """returns: (processes, total RSS MB, total PSS MB) of pid and all its descendants"""
+    pids, todo = [], [pid]
+    while todo:
+        p = todo.pop()
+        pids.append(p)
+        todo.extend(children(p))
+
+    rss = pss = 0
+    for p in pids:
+        try:
+            with open(f"/proc/{p}/smaps_rollup") as f:
+                for line in f:
+                    if line.startswith("Rss:"):
+                        rss += int(line.split()[1])
+                    elif line.startswith("Pss:"):
+                        pss += int(line.split()[1])
+        except OSError:
+            pass
+    return len(pids), rss / 1024, pss / 1024
+
+
+def start_server(mode, workers, port):
+    if mode == "prefork":
+        cmd = [sys.executable, "serve.py", "--workers", str(workers), "--port", str(port)]
+    else:
+        cmd = [sys.executable, "-m", "uvicorn", "server:app",
+               "--workers", str(workers), "--port", str(port)]
+    env = {**os.environ, "SINET_RESULT_CACHE_MB": "0"}  # every request must run the model
+    proc = subprocess.Popen(cmd, env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                            text=True, start_new_session=True)
+
+    ready = threading.Semaphore(0)
+
+    def watch():
+        for line in proc.stdout:
+            if READY in line:
+                ready.release()
+
+    threading.Thread(target=watch, daemon=True).start()
+    return proc, ready
+
+
+def stop_server(proc):
+    os.killpg(proc.pid, signal.SIGTERM)
+    try:
+        proc.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        os.killpg(proc.pid, signal.SIGKILL)
+        proc.wait()
+
+
+async def load(port, payload, concurrency, n_requests):
+    import httpx
+
+    latencies = []
+    sem = asyncio.Semaphore(concurrency)
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=None) as client:
+        async def one():
+            async with sem:
+                t0 = time.perf_counter()
+                r = await client.post("/predict", files={"file": ("image.jpg", payload, "image/jpeg")})
+                r.raise_for_status()
+                latencies.append((time.perf_counter() - t0) * 1000.0)
+
+        t0 = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(n_requests)))
+        elapsed = time.perf_counter() - t0
+
+    return {
+        "rps": n_requests / elapsed,
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+    }
+
+
+def run(mode, workers, payload, args):
+    port = free_port()
+    t0 = time.perf_counter()
+    proc, ready = start_server(mode, workers, port)
+    try:
+        for _ in range(workers):
+            if not ready.acquire(timeout=args.timeout):
+                raise RuntimeError(f"{mode} x{workers}: workers not ready after {args.timeout}s")
+        startup_s = time.perf_counter() - t0
+        _, _, idle_pss = tree_memory_mb(proc.pid)
+
+        concurrency = args.concurrency_per_worker * workers
+        asyncio.run(load(port, payload, concurrency, 2 * concurrency))  # warm up
+        result = asyncio.run(load(port, payload, concurrency, max(args.requests, concurrency)))
+        procs, rss, pss = tree_memory_mb(proc.pid)
+    finally:
+        stop_server(proc)
+
+    return {
+        "mode": mode,
+        "workers": workers,
+        "procs": procs,
+        "startup_s": startup_s,
+        "idle_pss_mb": idle_pss,
+        "rss_mb": rss,
+        "pss_mb": pss,
+        **result,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--weights", help="checkpoint (sets SINET_WEIGHTS)")
+    parser.add_argument("--image", help="image to upload (default: synthetic 1024x768 JPEG)")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--modes", nargs="+", choices=["prefork", "uvicorn"], default=["prefork", "uvicorn"])
+    parser.add_argument("--requests", type=int, default=64, help="timed requests per configuration")
+    parser.add_argument("--concurrency-per-worker", type=int, default=4)
+    parser.add_argument("--timeout", type=float, default=300, help="seconds to wait for startup")
+    args = parser.parse_args()
+
+    if args.weights:
+        os.environ["SINET_WEIGHTS"] = args.weights
+    payload = sample_image(args.image)
+
+    rows = []
+    for workers in args.workers:
+        for mode in args.modes:
+            print(f"📌 {mode} x{workers}...")
+            rows.append(run(mode, workers, payload, args))
+
+    print()
+    print_table(rows, [
+        ("mode", "mode", "s"),
+        ("workers", "workers", "d"),
+        ("procs", "procs", "d"),
+        ("startup_s", "startup s", ".1f"),
+        ("idle_pss_mb", "idle PSS MB", ".0f"),
+        ("rss_mb", "sum RSS MB", ".0f"),
+        ("pss_mb", "PSS MB", ".0f"),
+        ("rps", "req/s", ".2f"),
+        ("p50_ms", "p50 ms", ".0f"),
+        ("p99_ms", "p99 ms", ".0f"),
+    ])
+    print(f"\n{os.cpu_count()} CPUs; memory measured after the load, summed over the process tree")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+# backend/cascade.py
+# Coarse-to-fine inference for large images. One letterboxed pass
+# (run_inference) finds where the animal might be; only the tiles of a grid
+# that contain candidate pixels are run again at higher resolution, batched,
+# and feathered back into the coarse probability map. Background is never
+# re-run, unlike tiling.py, and the number of forwards is capped.
+#
+# The grid's tile size is the smallest of 352, 704, 1408, ... px (source
+# pixels per model input) that covers every candidate tile within the budget:
+# small animals are refined at native resolution, large ones at whatever
+# resolution the budget affords. A tile that only re-covers candidates of an
+# already chosen (overlapping) tile is skipped; if no size fits the budget,
+# the tiles with the most candidate pixels are kept.
+import cv2
+import numpy as np
+import torch
+
+from predict import INPUT_SIZE, predict_batch, run_inference, threshold_map
+from tiling import tile_starts, feather_window
+
+CANDIDATE_THRESHOLD = 0.3  # coarse probability that makes a pixel a candidate
+MIN_CANDIDATES = 64        # px; tiles with fewer candidate pixels are not refined
+COARSE_WEIGHT = 1e-3       # blend weight of the coarse map under refined tiles
+
+
+def candidate_tiles(candidates, tile, overlap, min_pixels=MIN_CANDIDATES):
+    """
+    candidates: bool [H,W]
+    returns: list of (count, y, x) for grid tiles holding >= min_pixels candidates
+    """
+    H, W = candidates.shape
+    counts = cv2.integral(candidates.astype(np.uint8))  # [H+1,W+1] int32
+    out = []
+    for y in tile_starts(H, tile, tile - overlap):
+        for x in tile_starts(W, tile, tile - overlap):
+            y1, x1 = min(y + tile, H), min(x + tile, W)
+            n = int(counts[y1, x1] - counts[y, x1] - counts[y1, x] + counts[y, x])
+            if n >= min_pixels:
+                out.append((n, y, x))
+    return out
+
+
+def cover_tiles(candidates, tiles, tile, min_pixels=MIN_CANDIDATES):
+    """
+    Greedy cover, fullest tiles first: a tile is kept only if it adds
+    >= min_pixels candidates not already inside a kept tile, so neighbouring
+    (overlapping) tiles aren't spent on the same animal.
+    tiles: from candidate_tiles
+    returns: list of (y, x), most candidates first
+    """
+    remaining = candidates.copy()
+    out = []
+    for _, y, x in sorted(tiles, reverse=True):
+        if np.count_nonzero(remaining[y:y + tile, x:x + tile]) >= min_pixels:
+            remaining[y:y + tile, x:x + tile] = False
+            out.append((y, x))
+    return out
+
+
+def plan_tiles(candidates, budget, input_size=INPUT_SIZE):
+    """
+    Picks the tile size and the tiles to refine (see module comment).
+    returns: (tile size, list of (y, x)); no tiles if refining can't gain 2x
+    """
+    H, W = candidates.shape
+    tile, chosen = None, []
+    size = input_size
+    while budget > 0 and 2 * size <= max(H, W):  # coarser tiles gain < 2x over the coarse pass
+        tile = size
+        chosen = cover_tiles(candidates, candidate_tiles(candidates, size, size // 4), size)
+        if len(chosen) <= budget:
+            break
+        size *= 2
+    return tile, chosen[:budget]
+
+
+def _refine(model, img, tiles, tile, batch_size, input_size):
+    """Yields (y, x, float32 prob [th,tw]) per tile, batched through the model."""
+    H, W = img.shape[:2]
+    for i in range(0, len(tiles), batch_size):
+        chunk = tiles[i:i + batch_size]
+        crops = []
+        for y, x in chunk:
+            crop = img[y:y + tile, x:x + tile]
+            if crop.shape[:2] != (tile, tile):  # image smaller than the tile on one side
+                crop = np.pad(crop, ((0, tile - crop.shape[0]), (0, tile - crop.shape[1]), (0, 0)))
+            if tile != input_size:
+                crop = cv2.resize(crop, (input_size, input_size), interpolation=cv2.INTER_AREA)
+            crops.append(crop)
+        with torch.no_grad():
+            probs = predict_batch(model, np.stack(crops))[:, 0].numpy()
+        for (y, x), p in zip(chunk, probs):
+            if tile != input_size:
+                p = cv2.resize(p, (tile, tile), interpolation=cv2.INTER_LINEAR)
+            yield y, x, p[:min(tile, H - y), :min(tile, W - x)]
+
+
+def run_cascade_prob(model, img, max_forwards=9, batch_size=8,
+                     candidate_threshold=CANDIDATE_THRESHOLD, input_size=INPUT_SIZE):
+    """
+    img: RGB uint8 [H,W,3] at full resolution
+    max_forwards: images run through the model in total, the coarse pass included
+    returns: uint8 0..255 probability map [H,W] (see predict.prob_map), stats dict
+    """
+    model.eval()
+    _, prob = run_inference(model, img, return_prob=True)
+
+    tile, tiles = plan_tiles(prob > candidate_threshold * 255, max_forwards - 1, input_size)
+    stats = {"forwards": 1 + len(tiles), "tile": tile if tiles else 0, "refined": len(tiles)}
+    if not tiles:
+        return prob, stats
+
+    # accumulate over the bounding box of the refined tiles only
+    H, W = prob.shape
+    top, left = min(y for y, _ in tiles), min(x for _, x in tiles)
+    bottom = min(max(y for y, _ in tiles) + tile, H)
+    right = min(max(x for _, x in tiles) + tile, W)
+    region = (slice(top, bottom), slice(left, right))
+
+    # the coarse map has a small weight everywhere, so refined tiles fade into
+    # it at their edges (window ramps to 0) and dominate inside
+    acc = prob[region].astype(np.float32) * (COARSE_WEIGHT / 255)
+    wsum = np.full(acc.shape, COARSE_WEIGHT, dtype=np.float32)
+    window = feather_window(tile, tile // 4, eps=0)
+    for y, x, p in _refine(model, img, tiles, tile, batch_size, input_size):
+        h, w = p.shape
+        win = window[:h, :w]
+        acc[y - top:y - top + h, x - left:x - left + w] += p * win
+        wsum[y - top:y - top + h, x - left:x - left + w] += win
+
+    prob[region] = np.rint(acc / wsum * 255)
+    return prob, stats
+
+
+def run_cascade_inference(model, img, max_forwards=9, batch_size=8, threshold=0.5,
+                          candidate_threshold=CANDIDATE_THRESHOLD, input_size=INPUT_SIZE):
+    """
+    Same as run_cascade_prob, thresholded.
+    returns: uint8 0/255 mask [H,W]
+    """
+    prob, _ = run_cascade_prob(model, img, max_forwards, batch_size, candidate_threshold, input_size)
+    return threshold_map(prob, threshold)
@@ -1,34 +1,151 @@
 # backend/dataset.py
 import os
+import json
+import hashlib
 from PIL import Image
 import numpy as np
 import torch
 from torch.utils.data import Dataset
 import torchvision.transforms as T
 
+IMAGENET_MEAN = [0.485, 0.456, 0.406]
+IMAGENET_STD = [0.229, 0.224, 0.225]
+
+CACHE_DATA = "data.bin"
+CACHE_INDEX = "index.json"
+
+
+def list_pairs(image_dir, mask_dir):
+    images = sorted([
+        f for f in os.listdir(image_dir)
+        if f.lower().endswith(('.png', '.jpg', '.jpeg'))
+    ])
+
+    masks = sorted([
+        f for f in os.listdir(mask_dir)
+        if f.lower().endswith(('.png', '.jpg', '.jpeg'))
+    ])
+
+    assert len(images) == len(masks), \
+        "❌ Number of images and masks do not match!"
+
+    return images, masks
+
+
+def load_pair(image_path, mask_path, target_size):
+    """
+    Decodes and resizes one sample.
+    returns: image uint8 [S,S,3], mask uint8 {0,1} [S,S]
+    """
+    img = Image.open(image_path).convert("RGB")
+    mask = Image.open(mask_path).convert("L")
+
+    # same resampling as T.Resize on a PIL image
+    img = img.resize((target_size, target_size), Image.BILINEAR)
+    mask = mask.resize((target_size, target_size), Image.NEAREST)
+
+    img = np.asarray(img, dtype=np.uint8)
+    mask = (np.asarray(mask) > 127).astype(np.uint8)
+    return img, mask
+
+
+# -----------------------------------------
+#   Preprocessed tensor cache
+# -----------------------------------------
+def cache_key(image_dir, mask_dir, images, masks, target_size):
+    """Changes whenever the source dirs, the file set, any mtime or target_size change."""
+    h = hashlib.sha1()
+    h.update(f"{os.path.abspath(image_dir)}|{os.path.abspath(mask_dir)}|{target_size}".encode())
+    for d, names in ((image_dir, images), (mask_dir, masks)):
+        for name in names:
+            st = os.stat(os.path.join(d, name))
+            h.update(f"|{name}:{st.st_mtime_ns}:{st.st_size}".encode())
+    return h.hexdigest()
+
+
+def build_cache(image_dir, mask_dir, cache_dir, target_size=352, max_samples=None):
+    """
+    Decodes every image/mask pair (or the first max_samples) once and writes
+    them into one contiguous file in cache_dir:
+
+        data.bin   - images uint8 [N,S,S,3], followed by masks uint8 {0,1} [N,S,S]
+        index.json - key, shapes, byte offsets and file names
+
+    The cache is reused as long as the key (see cache_key) matches.
+    returns: the index dict
+    """
+    images, masks = list_pairs(image_dir, mask_dir)
+    if max_samples is not None:
+        images, masks = images[:max_samples], masks[:max_samples]
+    key = cache_key(image_dir, mask_dir, images, masks, target_size)
+
+    index_path = os.path.join(cache_dir, CACHE_INDEX)
+    if os.path.exists(index_path):
+        with open(index_path) as f:
+            index = json.load(f)
+        if index["key"] == key:
+            return index
+
+    os.makedirs(cache_dir, exist_ok=True)
+    n, s = len(images), target_size
+    mask_offset = n * s * s * 3
+
+    # write to a temp file first so an interrupted build is never picked up
+    tmp_path = os.path.join(cache_dir, CACHE_DATA + ".tmp")
+    data = np.memmap(tmp_path, dtype=np.uint8, mode="w+", shape=(mask_offset + n * s * s,))
+    img_arr = data[:mask_offset].reshape(n, s, s, 3)
+    mask_arr = data[mask_offset:].reshape(n, s, s)
+
+    for i, (img_name, mask_name) in enumerate(zip(images, masks)):
+        img_arr[i], mask_arr[i] = load_pair(
+            os.path.join(image_dir, img_name),
+            os.path.join(mask_dir, mask_name),
+            target_size,
+        )
+
+    data.flush()
+    del data, img_arr, mask_arr
+    os.replace(tmp_path, os.path.join(cache_dir, CACHE_DATA))
+
+    index = {
+        "key": key,
+        "count": n,
+        "target_size": s,
+        "mask_offset": mask_offset,
+        "images": images,
+        "masks": masks,
+    }
+    with open(index_path + ".tmp", "w") as f:
+        json.dump(index, f)
+    os.replace(index_path + ".tmp", index_path)
+    return index
+
+
 class COD10KDataset(Dataset):
-    def __init__(self, image_dir, mask_dir, target_size=352, max_samples=None):
+    """
+    cache_dir: optional. When set, samples are decoded/resized once into a
+    memory-mapped cache (built or refreshed automatically, see build_cache)
+    and __getitem__ only normalizes.
+    """
+    def __init__(self, image_dir, mask_dir, target_size=352, max_samples=None, cache_dir=None):
         self.image_dir = image_dir
         self.mask_dir = mask_dir
         self.target_size = target_size
-
-        images = sorted([
-            f for f in os.listdir(image_dir)
-            if f.lower().endswith(('.png', '.jpg', '.jpeg'))
-        ])
-
-        masks = sorted([
-            f for f in os.listdir(mask_dir)
-            if f.lower().endswith(('.png', '.jpg', '.jpeg'))
-        ])
-
-        assert len(images) == len(masks), \
-            "❌ Number of images and masks do not match!"
+        self.cache_dir = cache_dir
+        self._cache = None  # opened lazily, once per worker process
 
         # Optionally use only first N samples (speed!)
-        if max_samples is not None:
-            images = images[:max_samples]
-            masks = masks[:max_samples]
+        if cache_dir is not None:
+            # only the subset is decoded and cached
+            index = build_cache(image_dir, mask_dir, cache_dir, target_size, max_samples)
+            images, masks = index["images"], index["masks"]
+            self._mask_offset = index["mask_offset"]
+            self._count = index["count"]
+        else:
+            images, masks = list_pairs(image_dir, mask_dir)
+            if max_samples is not None:
+                images = images[:max_samples]
+                masks = masks[:max_samples]
 
         self.images = images
         self.masks = masks
@@ -37,15 +154,67 @@ class COD10KDataset(Dataset):
             T.Resize((target_size, target_size)),
             T.ToTensor(),
             T.Normalize(
-                mean=[0.485, 0.456, 0.406],
-                std=[0.229, 0.224, 0.225]
+                mean=IMAGENET_MEAN,
+                std=IMAGENET_STD
             )
         ])
+        self.mean = torch.tensor(IMAGENET_MEAN).view(3, 1, 1)
+        self.std = torch.tensor(IMAGENET_STD).view(3, 1, 1)
 
     def __len__(self):
         return len(self.images)
 
+    def __getstate__(self):
+        # never pickle the memmap into DataLoader workers; they reopen it
+        state = self.__dict__.copy()
+        state["_cache"] = None
+        return state
+
+    def _open_cache(self):
+        if self._cache is None:
+            s, n = self.target_size, self._count
+            # copy-on-write: zero-copy reads, tensors stay writable
+            data = np.memmap(os.path.join(self.cache_dir, CACHE_DATA), dtype=np.uint8, mode="c")
+            self._cache = (
+                data[:self._mask_offset].reshape(n, s, s, 3),
+                data[self._mask_offset:].reshape(n, s, s),
+            )
+        return self._cache
+
+    def __getitems__(self, indices):
+        """
+        Batched fetch (used by DataLoader when present): a worker decodes a
+        whole batch per task and normalizes it with one tensor op.
+        """
+        if self.cache_dir is not None:
+            images, masks = self._open_cache()
+            imgs = torch.from_numpy(images[indices])  # one gather from the memmap
+            msks = torch.from_numpy(masks[indices])
+        else:
+            pairs = [
+                load_pair(
+                    os.path.join(self.image_dir, self.images[idx]),
+                    os.path.join(self.mask_dir, self.masks[idx]),
+                    self.target_size,
+                )
+                for idx in indices
+            ]
+            imgs = torch.from_numpy(np.stack([p[0] for p in pairs]))
+            msks = torch.from_numpy(np.stack([p[1] for p in pairs]))
+
+        imgs = imgs.permute(0, 3, 1, 2).float().div_(255)
+        imgs = (imgs - self.mean) / self.std
+        msks = msks.float().unsqueeze(1)
+        return list(zip(imgs, msks))
+
     def __getitem__(self, idx):
+        if self.cache_dir is not None:
+            images, masks = self._open_cache()
+            img = torch.from_numpy(images[idx]).permute(2, 0, 1)
+            img = (img.float().div_(255) - self.mean) / self.std
+            mask = torch.from_numpy(masks[idx]).float().unsqueeze(0)  # [1,H,W]
+            return img, mask
+
         img_name = self.images[idx]
         mask_name = self.masks[idx]
 
@@ -0,0 +1,167 @@
+# backend/evaluate.py
+# Accuracy and speed of a model on a labelled COD10K-style split, in one
+# JSON report, so every performance change can be checked for both.
+#
+#   python evaluate.py IMAGES_DIR GT_DIR --weights weights/sinet.pth \
+#       [--precision fp32|bf16|int8] [--tta none|flip|scales|full] \
+#       [--max-samples N] [--batch-size 8] [--out report.json] [--per-image] \
+#       [--full-decode]
+#
+# Images are paired with their GT masks like COD10KDataset (list_pairs) and
+# go through the serving pipeline: decode (reduced-scale JPEG decode, as the
+# server does for mask outputs; --full-decode to compare) -> preprocess
+# (letterbox) -> forward (batched) -> postprocess (full-resolution probability
+# map). Metrics (see metrics.py) are computed at GT resolution. Per-stage
+# timings are per image; a batch's forward time is split evenly over its
+# images.
+import os
+import json
+import time
+import argparse
+
+import numpy as np
+import torch
+from PIL import Image
+
+from bench_common import print_table
+from dataset import list_pairs
+from metrics import evaluate_pair
+from predict import INPUT_SIZE, init_model, preprocess, predict_batch, prob_map
+from runtime import PRECISIONS
+from tta import TTA_PRESETS
+from utils import decode_image
+
+STAGES = ["decode", "preprocess", "forward", "postprocess", "metrics"]
+
+
+def load_sample(image_dir, mask_dir, img_name, mask_name, full=False):
+    # like the server for mask outputs: reduced JPEG decode unless full=True
+    img, size = decode_image(os.path.join(image_dir, img_name), None if full else INPUT_SIZE)
+    gt = np.asarray(Image.open(os.path.join(mask_dir, mask_name)).convert("L"))
+    return img, size, gt
+
+
+def evaluate(model, image_dir, mask_dir, pairs, batch_size=8, tta="none", threshold=0.5, full_decode=False):
+    """
+    pairs: list of (image name, mask name)
+    full_decode: decode images at full resolution instead of the reduced JPEG path
+    returns: (per-image results, per-stage timings in ms per image)
+    """
+    results = []
+    timings = {stage: [] for stage in STAGES}
+
+    for i in range(0, len(pairs), batch_size):
+        chunk = pairs[i:i + batch_size]
+        samples = []
+        for img_name, mask_name in chunk:
+            t0 = time.perf_counter()
+            img, size, gt = load_sample(image_dir, mask_dir, img_name, mask_name, full_decode)
+            t1 = time.perf_counter()
+            lb, meta = preprocess(img, orig_size=size)
+            t2 = time.perf_counter()
+            timings["decode"].append((t1 - t0) * 1000.0)
+            timings["preprocess"].append((t2 - t1) * 1000.0)
+            samples.append((img_name, gt, lb, meta))
+
+        t0 = time.perf_counter()
+        with torch.no_grad():
+            cis = predict_batch(model, np.stack([lb for _, _, lb, _ in samples]), tta)
+        forward_ms = (time.perf_counter() - t0) * 1000.0 / len(samples)
+
+        for (name, gt, _, meta), ci in zip(samples, cis):
+            t0 = time.perf_counter()
+            prob = prob_map(ci, meta)
+            t1 = time.perf_counter()
+            scores = evaluate_pair(prob, gt, threshold)
+            t2 = time.perf_counter()
+            timings["forward"].append(forward_ms)
+            timings["postprocess"].append((t1 - t0) * 1000.0)
+            timings["metrics"].append((t2 - t1) * 1000.0)
+            results.append({"image": name, **scores})
+
+    return results, timings
+
+
+def summarize_timings(timings):
+    out = {}
+    for stage, ms in timings.items():
+        ms = np.array(ms)
+        out[stage] = {
+            "mean_ms": float(ms.mean()),
+            "p50_ms": float(np.percentile(ms, 50)),
+            "p99_ms": float(np.percentile(ms, 99)),
+            "total_s": float(ms.sum() / 1000.0),
+        }
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("image_dir")
+    parser.add_argument("mask_dir")
+    parser.add_argument("--weights", default=os.path.join("weights", "sinet.pth"))
+    parser.add_argument("--precision", choices=PRECISIONS, default="fp32")
+    parser.add_argument("--tta", choices=list(TTA_PRESETS), default="none")
+    parser.add_argument("--max-samples", type=int, default=None)
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--threshold", type=float, default=0.5, help="for IoU")
+    parser.add_argument("--out", default="eval_report.json")
+    parser.add_argument("--full-decode", action="store_true",
+                        help="decode images at full resolution (default: reduced JPEG decode, as served)")
+    parser.add_argument("--per-image", action="store_true", help="include per-image metrics in the report")
+    args = parser.parse_args()
+
+    images, masks = list_pairs(args.image_dir, args.mask_dir)
+    pairs = list(zip(images, masks))[:args.max_samples]
+
+    model = init_model(args.weights, precision=args.precision)
+    # warm up: the first forward pays for allocator / kernel setup
+    img, _, _ = load_sample(args.image_dir, args.mask_dir, *pairs[0])
+    with torch.no_grad():
+        predict_batch(model, preprocess(img)[0][None], args.tta)
+
+    print(f"📌 Evaluating {len(pairs)} images ({args.precision}, tta={args.tta})...")
+    t0 = time.perf_counter()
+    results, timings = evaluate(model, args.image_dir, args.mask_dir, pairs,
+                                args.batch_size, args.tta, args.threshold, args.full_decode)
+    elapsed = time.perf_counter() - t0
+
+    metric_names = [k for k in results[0] if k != "image"]
+    metrics = {k: float(np.mean([r[k] for r in results])) for k in metric_names}
+    pipeline_s = sum(sum(timings[s]) for s in STAGES if s != "metrics") / 1000.0
+
+    report = {
+        "weights": args.weights,
+        "precision": args.precision,
+        "tta": args.tta,
+        "threshold": args.threshold,
+        "full_decode": args.full_decode,
+        "samples": len(results),
+        "metrics": metrics,
+        "timings": summarize_timings(timings),
+        "images_per_sec": len(results) / pipeline_s,  # decode..postprocess, metrics excluded
+        "wall_s": elapsed,
+    }
+    if args.per_image:
+        report["per_image"] = results
+
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print_table([{"metric": k, "value": v} for k, v in metrics.items()], [
+        ("metric", "metric", "s"),
+        ("value", "value", ".4f"),
+    ])
+    print()
+    print_table([{"stage": s, **t} for s, t in report["timings"].items()], [
+        ("stage", "stage", "s"),
+        ("mean_ms", "mean ms", ".1f"),
+        ("p50_ms", "p50 ms", ".1f"),
+        ("p99_ms", "p99 ms", ".1f"),
+        ("total_s", "total s", ".2f"),
+    ])
+    print(f"\n✅ {report['images_per_sec']:.1f} images/sec (pipeline) -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+# backend/export.py
+# Compiles a trained SINet into a standalone fp32 inference artifact:
+#   - Ci-only network (SINet.inference_module: backbone + rf2..rf4 + folded PDC)
+#   - every BatchNorm folded into the conv before it
+#   - scripted + frozen TorchScript (weights become constants, conv+relu fused),
+#     loadable with torch alone - no torchvision, no models/ package
+#   - optionally the same graph as ONNX for other runtimes
+# The artifact is checked against the eager model before it is kept.
+#
+#   python export.py --weights weights/sinet.pth [--out weights/sinet_ts.pt] [--onnx weights/sinet.onnx]
+#   SINET_WEIGHTS=weights/sinet_ts.pt uvicorn server:app
+import os
+import argparse
+import torch
+import torch.nn as nn
+from torch.nn.utils.fusion import fuse_conv_bn_eval
+
+from bench_common import time_fn
+from models.sinet import load_model
+from runtime import load_scripted
+
+PARITY_SIZES = [(352, 352), (288, 416)]
+PARITY_ATOL = 1e-4
+
+
+def fold_batchnorm(net):
+    """
+    Folds eval-mode BatchNorm2d into the preceding Conv2d, in place.
+    Covers consecutive Sequential children (ResNet stem, downsample,
+    MobileNet / EfficientNet conv-norm-activation blocks) and convN/bnN
+    attribute pairs (ResNet blocks).
+    returns: number of folded BatchNorms
+    """
+    folded = 0
+    for m in list(net.modules()):
+        pairs = []
+        if isinstance(m, nn.Sequential):
+            names = list(m._modules)
+            pairs += list(zip(names, names[1:]))
+        pairs += [(f"conv{i}", f"bn{i}") for i in (1, 2, 3)]
+
+        for conv_name, bn_name in pairs:
+            conv, bn = getattr(m, conv_name, None), getattr(m, bn_name, None)
+            # exact type: subclasses (e.g. timm's BatchNormAct2d) carry an activation
+            if isinstance(conv, nn.Conv2d) and type(bn) is nn.BatchNorm2d:
+                setattr(m, conv_name, fuse_conv_bn_eval(conv, bn))
+                setattr(m, bn_name, nn.Identity())
+                folded += 1
+    return folded
+
+
+def compile_model(model):
+    """
+    model: trained SINet
+    returns: frozen TorchScript Ci-only module (fp32 in, Ci logits out)
+    """
+    net = model.inference_module()
+    n = fold_batchnorm(net)
+    print(f"📌 Folded {n} BatchNorm layers")
+    scripted = torch.jit.script(net)
+    return torch.jit.freeze(scripted)
+
+
+def check_parity(model, path, sizes=PARITY_SIZES, atol=PARITY_ATOL):
+    """Max |artifact - eager| on Ci over random inputs; raises if above atol."""
+    artifact = load_scripted(path)
+    worst = 0.0
+    with torch.no_grad():
+        for h, w in sizes:
+            x = torch.randn(2, 3, h, w)
+            worst = max(worst, (artifact.predict(x) - model.predict(x)).abs().max().item())
+    if worst > atol:
+        raise RuntimeError(f"exported model differs from eager by {worst:.2e} (> {atol:.0e})")
+    return worst
+
+
+def compare_latency(model, path, size=352, iters=10):
+    artifact = load_scripted(path)
+    x = torch.randn(1, 3, size, size)
+    with torch.no_grad():
+        eager = time_fn(lambda: model.predict(x), iters=iters)
+        scripted = time_fn(lambda: artifact.predict(x), iters=iters)
+    return eager["p50_ms"], scripted["p50_ms"]
+
+
+def export_onnx(model, path, opset=17):
+    net = model.inference_module()
+    fold_batchnorm(net)
+    torch.onnx.export(
+        net, torch.zeros(1, 3, 352, 352), path,
+        input_names=["image"], output_names=["ci"], opset_version=opset,
+        dynamic_axes={"image": {0: "batch", 2: "height", 3: "width"},
+                      "ci": {0: "batch", 2: "height", 3: "width"}},
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--weights", default=os.path.join("weights", "sinet.pth"))
+    parser.add_argument("--out", default=os.path.join("weights", "sinet_ts.pt"))
+    parser.add_argument("--onnx", help="also write an ONNX model to this path")
+    args = parser.parse_args()
+
+    model = load_model(args.weights)
+    with torch.no_grad():
+        torch.jit.save(compile_model(model), args.out)
+
+    try:
+        err = check_parity(model, args.out)
+    except RuntimeError:
+        os.remove(args.out)
+        raise
+    print(f"✅ Parity with eager model: max |diff| {err:.2e}")
+    print(f"💾 TorchScript model saved to: {args.out} ({os.path.getsize(args.out) / 2**20:.1f} MB)")
+
+    eager_ms, scripted_ms = compare_latency(model, args.out)
+    print(f"📊 Latency @352, batch 1: eager {eager_ms:.1f} ms, exported {scripted_ms:.1f} ms")
+
+    if args.onnx:
+        try:
+            export_onnx(model, args.onnx)
+        except ImportError as e:
+            print(f"⚠️ ONNX export skipped: {e}")
+        else:
+            print(f"💾 ONNX model saved to: {args.onnx}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+# backend/feature_cache.py
+# Precomputed backbone features for training only the RF/PDC heads.
+#
+# get_model() freezes stem + layer1..layer4, and without augmentation their
+# outputs never change between epochs. Running the backbone once per image
+# and training from the stored x1..x4 skips the bulk of every training step.
+import os
+import json
+import hashlib
+import numpy as np
+import torch
+from torch.utils.data import Dataset, DataLoader
+
+from dataset import cache_key
+
+INDEX = "index.json"
+LEVELS = ["x1", "x2", "x3", "x4"]
+
+
+def backbone_hash(model):
+    """Fingerprint of the frozen backbone weights (and BN running stats)."""
+    h = hashlib.sha1()
+    for name, t in model.state_dict().items():
+        if name.startswith(("stem.", "layer")):
+            h.update(name.encode())
+            h.update(t.detach().cpu().contiguous().numpy().tobytes())
+    return h.hexdigest()
+
+
+def build_feature_cache(model, ds, cache_dir, fp16=True, batch_size=8):
+    """
+    Runs model.backbone once over every sample of `ds` (a COD10KDataset) and
+    stores x1..x4 plus the masks as memory-mapped arrays in cache_dir.
+    The backbone runs in eval mode, so BatchNorm uses its running stats.
+
+    Reused as long as the dataset files, target_size, backbone weights and
+    dtype are unchanged.
+    returns: the index dict
+    """
+    key = hashlib.sha1("|".join([
+        cache_key(ds.image_dir, ds.mask_dir, ds.images, ds.masks, ds.target_size),
+        backbone_hash(model),
+        "fp16" if fp16 else "fp32",
+    ]).encode()).hexdigest()
+
+    index_path = os.path.join(cache_dir, INDEX)
+    if os.path.exists(index_path):
+        with open(index_path) as f:
+            index = json.load(f)
+        if index["key"] == key:
+            return index
+        os.remove(index_path)  # stale: make sure a half-done rebuild is never used
+
+    os.makedirs(cache_dir, exist_ok=True)
+    dtype = np.float16 if fp16 else np.float32
+    n = len(ds)
+    s = ds.target_size
+
+    was_training = model.training
+    model.eval()
+    loader = DataLoader(ds, batch_size=batch_size, shuffle=False)
+
+    arrays = None
+    shapes = None
+    i = 0
+    with torch.no_grad():
+        for img, mask in loader:
+            feats = model.backbone(img)
+            if arrays is None:
+                shapes = {lvl: list(f.shape[1:]) for lvl, f in zip(LEVELS, feats)}
+                shapes["mask"] = [1, s, s]
+                arrays = {
+                    lvl: np.memmap(os.path.join(cache_dir, f"{lvl}.bin"), dtype=dtype,
+                                   mode="w+", shape=(n, *shapes[lvl]))
+                    for lvl in LEVELS
+                }
+                arrays["mask"] = np.memmap(os.path.join(cache_dir, "mask.bin"), dtype=np.uint8,
+                                           mode="w+", shape=(n, 1, s, s))
+
+            b = img.shape[0]
+            for lvl, f in zip(LEVELS, feats):
+                arrays[lvl][i:i + b] = f.cpu().numpy().astype(dtype)
+            arrays["mask"][i:i + b] = mask.numpy().astype(np.uint8)
+            i += b
+
+    for arr in arrays.values():
+        arr.flush()
+    model.train(was_training)
+
+    index = {
+        "key": key,
+        "count": n,
+        "dtype": "float16" if fp16 else "float32",
+        "shapes": shapes,
+    }
+    with open(index_path + ".tmp", "w") as f:
+        json.dump(index, f)
+    os.replace(index_path + ".tmp", index_path)
+    return index
+
+
+def cache_size_mb(cache_dir):
+    return sum(
+        os.path.getsize(os.path.join(cache_dir, f))
+        for f in os.listdir(cache_dir) if f.endswith(".bin")
+    ) / 2**20
+
+
+class FeatureDataset(Dataset):
+    """
+    Reads a cache written by build_feature_cache.
+    Each sample: ((x1, x2, x3, x4), mask) as float32 tensors.
+    """
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        with open(os.path.join(cache_dir, INDEX)) as f:
+            self.index = json.load(f)
+        self._arrays = None  # opened lazily, once per worker process
+
+    def __len__(self):
+        return self.index["count"]
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_arrays"] = None
+        return state
+
+    def _open(self):
+        if self._arrays is None:
+            n = self.index["count"]
+            shapes = self.index["shapes"]
+            self._arrays = {
+                lvl: np.memmap(os.path.join(self.cache_dir, f"{lvl}.bin"),
+                               dtype=self.index["dtype"], mode="r", shape=(n, *shapes[lvl]))
+                for lvl in LEVELS
+            }
+            self._arrays["mask"] = np.memmap(os.path.join(self.cache_dir, "mask.bin"),
+                                             dtype=np.uint8, mode="r", shape=(n, *shapes["mask"]))
+        return self._arrays
+
+    def __getitems__(self, indices):
+        arrays = self._open()
+        # fancy indexing copies out of the memmap, so the tensors are writable
+        feats = [torch.from_numpy(arrays[lvl][indices]).float() for lvl in LEVELS]
+        masks = torch.from_numpy(arrays["mask"][indices]).float()
+        return [
+            (tuple(f[j] for f in feats), masks[j])
+            for j in range(len(indices))
+        ]
+
+    def __getitem__(self, idx):
+        return self.__getitems__([idx])[0]
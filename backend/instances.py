@@ -0,0 +1,51 @@
+# backend/instances.py
+# Per-instance detections from a mask: one connected component per animal,
+# with its box, area, centroid and mean probability, computed from
+# cv2.connectedComponentsWithStats in a single pass over the image.
+import cv2
+import numpy as np
+
+MIN_AREA = 64          # px; smaller blobs are treated as noise
+POLYGON_EPSILON = 1.0  # px; contour simplification (cv2.approxPolyDP)
+
+
+def extract_instances(mask, prob=None, min_area=MIN_AREA, contours=False):
+    """
+    mask: uint8 0/255 [H,W]
+    prob: optional uint8 0..255 probability map (predict.prob_map), for scores
+    min_area: drop components smaller than this (px)
+    contours: also return each instance's outer polygon
+    returns: list of dicts, largest first:
+        {"box": [x, y, w, h], "area", "centroid": [x, y], "score", ["polygon": [[x, y], ...]]}
+        score is the mean probability over the instance (None without prob)
+    """
+    n, labels, stats, centroids = cv2.connectedComponentsWithStats(
+        (mask > 0).astype(np.uint8), connectivity=8
+    )
+    areas = stats[:, cv2.CC_STAT_AREA]
+
+    # label 0 is the background
+    keep = np.flatnonzero(areas[1:] >= min_area) + 1
+    keep = keep[np.argsort(-areas[keep], kind="stable")]
+
+    scores = None
+    if prob is not None and len(keep):
+        sums = np.bincount(labels.ravel(), weights=prob.ravel(), minlength=n)
+        scores = sums / np.maximum(areas, 1) / 255.0
+
+    out = []
+    for i in keep:
+        x, y, w, h = (int(v) for v in stats[i, :4])
+        inst = {
+            "box": [x, y, w, h],
+            "area": int(areas[i]),
+            "centroid": [round(float(c), 1) for c in centroids[i]],
+            "score": round(float(scores[i]), 4) if scores is not None else None,
+        }
+        if contours:
+            roi = (labels[y:y + h, x:x + w] == i).astype(np.uint8)
+            found, _ = cv2.findContours(roi, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+            poly = cv2.approxPolyDP(max(found, key=cv2.contourArea), POLYGON_EPSILON, True)
+            inst["polygon"] = (poly[:, 0] + (x, y)).tolist()
+        out.append(inst)
+    return out
@@ -0,0 +1,180 @@
+# backend/metrics.py
+# Standard camouflaged / salient object detection metrics for one prediction
+# at ground-truth resolution. Everything is whole-array NumPy / OpenCV: no
+# per-pixel or per-threshold Python loops.
+#
+#   pred: uint8 0..255 probability map (predict.prob_map) or float 0..1
+#   gt:   bool / 0-255 mask of the same size
+#
+# Definitions follow the reference MATLAB code of each paper (as used by the
+# COD10K / SINet evaluation toolboxes):
+#   MAE, S-measure (Fan et al. 2017), E-measure (Fan et al. 2018, mean and
+#   max over 256 thresholds), weighted F-measure (Margolin et al. 2014), IoU.
+import cv2
+import numpy as np
+
+EPS = np.finfo(np.float64).eps
+
+
+def _prep(pred, gt):
+    pred = np.asarray(pred)
+    pred = pred.astype(np.float64) / 255.0 if pred.dtype == np.uint8 else pred.astype(np.float64)
+    gt = np.asarray(gt)
+    gt = gt > 127 if gt.dtype == np.uint8 else gt.astype(bool)
+    return pred, gt
+
+
+def mae(pred, gt):
+    pred, gt = _prep(pred, gt)
+    return float(np.abs(pred - gt).mean())
+
+
+def iou(pred, gt, threshold=0.5):
+    pred, gt = _prep(pred, gt)
+    fg = pred > threshold
+    union = np.logical_or(fg, gt).sum()
+    return float(np.logical_and(fg, gt).sum() / union) if union else 1.0
+
+
+# ------------------ S-measure ------------------
+
+def _s_object(x, mask):
+    vals = x[mask]
+    if vals.size < 2:
+        return 0.0
+    mean = vals.mean()
+    return 2 * mean / (mean ** 2 + 1 + vals.std(ddof=1) + EPS)
+
+
+def _ssim(pred, gt):
+    n = pred.size
+    if n < 2:
+        return 0.0
+    x, y = pred.mean(), gt.mean()
+    sx = ((pred - x) ** 2).sum() / (n - 1)
+    sy = ((gt - y) ** 2).sum() / (n - 1)
+    sxy = ((pred - x) * (gt - y)).sum() / (n - 1)
+    alpha = 4 * x * y * sxy
+    beta = (x ** 2 + y ** 2) * (sx + sy)
+    if alpha != 0:
+        return alpha / (beta + EPS)
+    return 1.0 if beta == 0 else 0.0
+
+
+def s_measure(pred, gt, alpha=0.5):
+    pred, gt = _prep(pred, gt)
+    y = gt.mean()
+    if y == 0:
+        return float(1 - pred.mean())
+    if y == 1:
+        return float(pred.mean())
+
+    # object-aware
+    so = y * _s_object(pred, gt) + (1 - y) * _s_object(1 - pred, ~gt)
+
+    # region-aware: split at the GT centroid into 4 quadrants
+    h, w = gt.shape
+    ys, xs = np.nonzero(gt)
+    cx, cy = int(round(xs.mean())) + 1, int(round(ys.mean())) + 1
+    gtf = gt.astype(np.float64)
+    sr = 0.0
+    for rows, cols in ((slice(0, cy), slice(0, cx)), (slice(0, cy), slice(cx, w)),
+                       (slice(cy, h), slice(0, cx)), (slice(cy, h), slice(cx, w))):
+        p, g = pred[rows, cols], gtf[rows, cols]
+        sr += g.size / (h * w) * _ssim(p, g)
+
+    return float(max(0.0, alpha * so + (1 - alpha) * sr))
+
+
+# ------------------ E-measure ------------------
+
+def e_measure(pred, gt):
+    """
+    Enhanced-alignment measure at all 256 thresholds at once. With a binary
+    prediction and a binary GT, every pixel falls in one of four
+    (pred, gt) cases, so the per-pixel alignment term only takes four values
+    per threshold and the sum reduces to counts from cumulative histograms.
+    returns: (mean Em, max Em) over thresholds
+    """
+    pred, gt = _prep(pred, gt)
+    n = gt.size
+    q = np.rint(pred * 255).astype(np.int64)
+
+    # pixels with q >= t, for t = 0..255, split by GT
+    fg_hist = np.bincount(q[gt], minlength=256)
+    bg_hist = np.bincount(q[~gt], minlength=256)
+    tp = np.cumsum(fg_hist[::-1])[::-1].astype(np.float64)  # pred fg, gt fg
+    fp = np.cumsum(bg_hist[::-1])[::-1].astype(np.float64)  # pred fg, gt bg
+    gt_fg = gt.sum()
+    fn = gt_fg - tp
+    tn = (n - gt_fg) - fp
+
+    if gt_fg == 0:
+        scores = (fn + tn) / (n - 1 + EPS)       # enhanced = 1 - pred
+    elif gt_fg == n:
+        scores = (tp + fp) / (n - 1 + EPS)       # enhanced = pred
+    else:
+        mu_p = (tp + fp) / n
+        mu_g = gt_fg / n
+        total = 0.0
+        for count, p, g in ((tp, 1, 1), (fp, 1, 0), (fn, 0, 1), (tn, 0, 0)):
+            dp, dg = p - mu_p, g - mu_g
+            align = 2 * dp * dg / (dp ** 2 + dg ** 2 + EPS)
+            total = total + count * (align + 1) ** 2 / 4
+        scores = total / (n - 1 + EPS)
+
+    return float(scores.mean()), float(scores.max())
+
+
+# ------------------ weighted F-measure ------------------
+
+def _gauss_kernel(size=7, sigma=5):
+    k = cv2.getGaussianKernel(size, sigma)
+    return k @ k.T
+
+
+def weighted_f_measure(pred, gt, beta=1.0):
+    """
+    Distances to the GT use OpenCV's 5x5 approximate Euclidean transform
+    (within ~2% of the exact bwdist the reference code uses).
+    """
+    pred, gt = _prep(pred, gt)
+    if not gt.any():
+        return 0.0
+
+    # distance of every background pixel to its nearest GT pixel, and which one
+    src = (~gt).astype(np.uint8)  # zeros = GT pixels
+    dist, labels = cv2.distanceTransformWithLabels(
+        src, cv2.DIST_L2, 5, labelType=cv2.DIST_LABEL_PIXEL
+    )
+
+    err = np.abs(pred - gt)
+    # background pixels take the error of their nearest GT pixel
+    # (labels number the zero pixels of src in raster order, from 1)
+    err_t = err[gt][labels - 1]
+    err_t[gt] = err[gt]
+
+    ea = cv2.filter2D(err_t, -1, _gauss_kernel(), borderType=cv2.BORDER_CONSTANT)
+    min_e = np.where(gt & (ea < err), ea, err)
+
+    weight = np.where(gt, 1.0, 2 - np.exp(np.log(0.5) / 5 * dist))
+    ew = min_e * weight
+
+    tpw = gt.sum() - ew[gt].sum()
+    fpw = ew[~gt].sum()
+    recall = 1 - ew[gt].mean()
+    precision = tpw / (tpw + fpw + EPS)
+    return float((1 + beta ** 2) * recall * precision / (beta ** 2 * precision + recall + EPS))
+
+
+def evaluate_pair(pred, gt, threshold=0.5):
+    """All metrics for one image. returns: dict name -> float"""
+    em_mean, em_max = e_measure(pred, gt)
+    return {
+        "mae": mae(pred, gt),
+        "s_measure": s_measure(pred, gt),
+        "e_measure": em_mean,
+        "e_measure_max": em_max,
+        "weighted_f": weighted_f_measure(pred, gt),
+        "iou": iou(pred, gt, threshold),
+    }
@@ -1,2 +1,2 @@
-from .sinet import SINet, get_model, load_model
-
+from .sinet import SINet, get_model, load_model, load_checkpoint, model_checkpoint
+from .backbones import BACKBONES, DEFAULT_BACKBONE
@@ -0,0 +1,97 @@
+# backend/models/backbones.py
+# Feature extractors SINet can be built on. Every builder returns the network
+# as a stem plus four stages whose outputs are at 1/4, 1/8, 1/16 and 1/32 of
+# the input, and the channel width of each stage, so the RF / PDC heads can be
+# sized from them. SINet keeps the stages as stem / layer1..layer4, whatever
+# the backbone.
+import torch
+import torch.nn as nn
+from torchvision import models
+
+DEFAULT_BACKBONE = "resnet18"
+STAGE_STRIDES = (4, 8, 16, 32)
+
+
+def split_stages(blocks, probe_size=64):
+    """
+    blocks: ordered modules, each taking the previous one's output
+    Groups the blocks by the stride of their output: blocks before the first
+    1/4 output form the stem, then one stage per STAGE_STRIDES entry. The
+    widths are read off a dummy forward (in eval mode, so BatchNorm running
+    stats are left alone).
+    returns: stem, [4 stages], [4 channel widths]
+    """
+    groups = {s: [] for s in (0, *STAGE_STRIDES)}
+    widths = {}
+    x = torch.zeros(1, 3, probe_size, probe_size)
+    with torch.no_grad():
+        for block in blocks:
+            training = block.training
+            x = block.eval()(x)
+            block.train(training)
+            stride = probe_size // x.shape[-1]
+            if stride < STAGE_STRIDES[0]:
+                stride = 0
+            elif stride not in groups:
+                raise ValueError(f"unexpected block output stride {stride}")
+            groups[stride].append(block)
+            widths[stride] = x.shape[1]
+
+    missing = [s for s in STAGE_STRIDES if not groups[s]]
+    if missing:
+        raise ValueError(f"backbone has no stage at stride {missing}")
+    stages = [nn.Sequential(*groups[s]) for s in STAGE_STRIDES]
+    return nn.Sequential(*groups[0]), stages, [widths[s] for s in STAGE_STRIDES]
+
+
+def resnet18(pretrained):
+    # laid out by hand: checkpoints predate split_stages (which would move
+    # the maxpool into layer1)
+    weights = models.ResNet18_Weights.IMAGENET1K_V1 if pretrained else None
+    res = models.resnet18(weights=weights)
+    stem = nn.Sequential(res.conv1, res.bn1, res.relu, res.maxpool)
+    return stem, [res.layer1, res.layer2, res.layer3, res.layer4], [64, 128, 256, 512]
+
+
+def mobilenet_v3_large(pretrained):
+    weights = models.MobileNet_V3_Large_Weights.IMAGENET1K_V1 if pretrained else None
+    net = models.mobilenet_v3_large(weights=weights)
+    return split_stages(list(net.features)[:-1])  # last block: 1x1 expansion for the classifier
+
+
+def mobilenet_v3_small(pretrained):
+    weights = models.MobileNet_V3_Small_Weights.IMAGENET1K_V1 if pretrained else None
+    net = models.mobilenet_v3_small(weights=weights)
+    return split_stages(list(net.features)[:-1])
+
+
+def efficientnet_b0(pretrained):
+    weights = models.EfficientNet_B0_Weights.IMAGENET1K_V1 if pretrained else None
+    net = models.efficientnet_b0(weights=weights)
+    return split_stages(list(net.features)[:-1])
+
+
+def efficientnet_lite0(pretrained):
+    # EfficientNet-lite (no squeeze-excite, ReLU6) is not in torchvision
+    try:
+        import timm
+    except ImportError:
+        raise ImportError("the efficientnet_lite0 backbone needs timm (pip install timm)") from None
+    net = timm.create_model("efficientnet_lite0", pretrained=pretrained)
+    return split_stages([nn.Sequential(net.conv_stem, net.bn1), *net.blocks])
+
+
+BACKBONES = {
+    "resnet18": resnet18,
+    "mobilenet_v3_large": mobilenet_v3_large,
+    "mobilenet_v3_small": mobilenet_v3_small,
+    "efficientnet_b0": efficientnet_b0,
+    "efficientnet_lite0": efficientnet_lite0,
+}
+
+
+def build_backbone(name, pretrained=True):
+    """returns: stem, [layer1..layer4], [their channel widths]"""
+    if name not in BACKBONES:
+        raise ValueError(f"unknown backbone {name!r}; choose from {list(BACKBONES)}")
+    return BACKBONES[name](pretrained)
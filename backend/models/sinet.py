@@ -1,8 +1,14 @@
 # backend/models/sinet.py
+import copy
+from typing import List, Optional
 import torch
 import torch.nn as nn
 import torch.nn.functional as F
-from torchvision import models
+
+from .backbones import DEFAULT_BACKBONE, build_backbone
+
+# RF / PDC width; narrower if the backbone's 1/4-scale stage is narrower
+RF_CHANNELS = 32
 
 # -----------------------------------------
 #  Receptive Field Block (RF)
@@ -57,19 +63,49 @@ class RFBlock(nn.Module):
 class PDC(nn.Module):
     """
     Fuses multi-scale RF features into a single-channel camouflage map.
+
+    There is no non-linearity between the per-branch 3x3 convs and the final
+    1x1 conv, and bilinear upsampling is linear, so the 1x1 projection can be
+    folded into each branch. The fused path runs a 3x3 -> 1 channel conv at
+    native resolution and upsamples/sums single-channel maps instead of
+    building 32 * len(feats) full-resolution channels. Same parameters, same
+    output up to float rounding; set fused=False for the original path.
     """
-    def __init__(self, in_ch_list):
+    def __init__(self, in_ch_list, mid_ch=32, fused=True):
         super().__init__()
+        self.mid_ch = mid_ch
+        self.fused = fused
         self.convs = nn.ModuleList([
-            nn.Conv2d(ch, 32, 3, padding=1) for ch in in_ch_list
+            nn.Conv2d(ch, mid_ch, 3, padding=1) for ch in in_ch_list
         ])
-        self.final = nn.Conv2d(32 * len(in_ch_list), 1, 1)
+        self.final = nn.Conv2d(mid_ch * len(in_ch_list), 1, 1)
 
     def forward(self, feats, out_size):
         """
         feats: list of feature maps
         out_size: (H, W) of the desired output (usually input image size)
         """
+        if self.fused:
+            return self.forward_fused(feats, out_size)
+        return self.forward_concat(feats, out_size)
+
+    def forward_fused(self, feats, out_size):
+        H, W = out_size
+        # final.weight: [1, mid*n, 1, 1] -> one [1, mid] slice per branch
+        w_final = self.final.weight.flatten(1).split(self.mid_ch, dim=1)
+
+        out = None
+        for conv, w, f in zip(self.convs, w_final, feats):
+            weight = torch.einsum("om,mchw->ochw", w, conv.weight)  # [1,C,3,3]
+            bias = w @ conv.bias                                     # [1]
+            x = F.conv2d(f, weight, bias, padding=conv.padding)
+            x = F.interpolate(x, (H, W), mode="bilinear", align_corners=False)
+            out = x if out is None else out + x
+
+        out = out + self.final.bias.view(1, -1, 1, 1)
+        return torch.sigmoid(out)
+
+    def forward_concat(self, feats, out_size):
         H, W = out_size
         ups = []
 
@@ -83,59 +119,92 @@ class PDC(nn.Module):
         return torch.sigmoid(x)
 
 
+class FoldedPDC(nn.Module):
+    """
+    Inference-only copy of a PDC with the final 1x1 projection baked into
+    one 3x3 -> 1 channel conv per branch (the same algebra as
+    PDC.forward_fused, done once instead of per call). The final bias goes
+    into the first branch: bilinear upsampling preserves constants.
+    Plain Conv2d modules, so it can be quantized and scripted.
+    """
+    def __init__(self, pdc):
+        super().__init__()
+        w_final = pdc.final.weight.detach().flatten(1).split(pdc.mid_ch, dim=1)
+
+        self.convs = nn.ModuleList()
+        for i, (conv, w) in enumerate(zip(pdc.convs, w_final)):
+            folded = nn.Conv2d(conv.in_channels, 1, 3, padding=1)
+            with torch.no_grad():
+                folded.weight.copy_(torch.einsum("om,mchw->ochw", w, conv.weight))
+                folded.bias.copy_(w @ conv.bias)
+                if i == 0:
+                    folded.bias += pdc.final.bias
+            self.convs.append(folded)
+
+    def forward(self, feats: List[torch.Tensor], out_size: List[int]):
+        out: Optional[torch.Tensor] = None
+        for i, conv in enumerate(self.convs):
+            x = F.interpolate(conv(feats[i]), size=out_size, mode="bilinear", align_corners=False)
+            out = x if out is None else out + x
+        assert out is not None
+        return torch.sigmoid(out)
+
+
 # -----------------------------------------
 #                 SINet
 # -----------------------------------------
 class SINet(nn.Module):
     """
     Simplified SINet architecture with:
-    - ResNet18 backbone (faster than ResNet50 – good for your CPU)
+    - a pretrained backbone, ResNet18 by default (see models/backbones.py)
     - RF blocks
     - Multi-scale PDC fusion
 
     Produces: Ci (refined final map), Cs (coarse map)
     Both are [B,1,H,W] in SAME spatial size as input.
+
+    pretrained: initialise the backbone from torchvision's ImageNet weights.
+    Only needed for training from scratch; when a SINet checkpoint is loaded
+    on top, pass False so nothing is downloaded or read from the torch hub.
+    backbone: name from backbones.BACKBONES; RF / PDC channels follow its
+    stage widths
     """
-    def __init__(self):
+    def __init__(self, pretrained=True, backbone=DEFAULT_BACKBONE):
         super().__init__()
+        self.backbone_name = backbone
 
-        # Use ResNet18 for speed
-        res = models.resnet18(weights=models.ResNet18_Weights.IMAGENET1K_V1)
-
-        # ResNet18 structure:
-        # res.conv1 -> res.bn1 -> res.relu -> res.maxpool
-        # -> layer1 -> layer2 -> layer3 -> layer4
-        self.stem = nn.Sequential(
-            res.conv1,
-            res.bn1,
-            res.relu,
-            res.maxpool,
-        )
-        self.layer1 = res.layer1  # 64
-        self.layer2 = res.layer2  # 128
-        self.layer3 = res.layer3  # 256
-        self.layer4 = res.layer4  # 512
+        # stem -> layer1 (1/4) -> layer2 (1/8) -> layer3 (1/16) -> layer4 (1/32)
+        self.stem, stages, widths = build_backbone(backbone, pretrained)
+        self.layer1, self.layer2, self.layer3, self.layer4 = stages
 
-        # RF blocks (channel sizes match ResNet18)
-        self.rf1 = RFBlock(64)   # layer1
-        self.rf2 = RFBlock(128)  # layer2
-        self.rf3 = RFBlock(256)  # layer3
-        self.rf4 = RFBlock(512)  # layer4
+        # RF blocks, one per stage (ResNet18: 64, 128, 256, 512 -> 32 each)
+        mid = min(RF_CHANNELS, widths[0])
+        self.rf1 = RFBlock(widths[0], mid)  # layer1
+        self.rf2 = RFBlock(widths[1], mid)  # layer2
+        self.rf3 = RFBlock(widths[2], mid)  # layer3
+        self.rf4 = RFBlock(widths[3], mid)  # layer4
 
         # Coarse PDC (use all RF features)
-        self.pdc_s = PDC([32, 32, 32, 32])
+        self.pdc_s = PDC([mid] * 4, mid_ch=mid)
 
         # Refined PDC (use deeper RF features only)
-        self.pdc_i = PDC([32, 32, 32])
+        self.pdc_i = PDC([mid] * 3, mid_ch=mid)
 
-    def forward(self, x):
-        B, C, H, W = x.shape
+    def backbone(self, x):
+        x = self.stem(x)
+        x1 = self.layer1(x) # 1/4
+        x2 = self.layer2(x1) # 1/8
+        x3 = self.layer3(x2) # 1/16
+        x4 = self.layer4(x3) # 1/32
+        return x1, x2, x3, x4
 
-        x = self.stem(x)    # 1/4 size
-        x1 = self.layer1(x) # 64, 1/4
-        x2 = self.layer2(x1) # 128, 1/8
-        x3 = self.layer3(x2) # 256, 1/16
-        x4 = self.layer4(x3) # 512, 1/32
+    def heads(self, feats, out_size):
+        """
+        RF + PDC part of the network.
+        feats: backbone outputs (x1, x2, x3, x4)
+        out_size: (H, W) of the maps to produce
+        """
+        x1, x2, x3, x4 = feats
 
         # RF features
         f1 = self.rf1(x1)
@@ -144,19 +213,83 @@ class SINet(nn.Module):
         f4 = self.rf4(x4)
 
         # Coarse map: use all RF features
-        Cs = self.pdc_s([f1, f2, f3, f4], out_size=(H, W))
+        Cs = self.pdc_s([f1, f2, f3, f4], out_size=out_size)
 
         # Refined map: use deeper features only
-        Ci = self.pdc_i([f2, f3, f4], out_size=(H, W))
+        Ci = self.pdc_i([f2, f3, f4], out_size=out_size)
 
         return Ci, Cs
 
+    def forward(self, x):
+        B, C, H, W = x.shape
+        return self.heads(self.backbone(x), out_size=(H, W))
+
+    def predict(self, x):
+        """
+        Inference-only path: returns Ci alone.
+        Skips rf1 (1/4-scale layer1 features) and the coarse pdc_s branch,
+        which are only needed for the Cs training loss.
+        """
+        B, C, H, W = x.shape
+
+        x1, x2, x3, x4 = self.backbone(x)
+
+        f2 = self.rf2(x2)
+        f3 = self.rf3(x3)
+        f4 = self.rf4(x4)
+
+        return self.pdc_i([f2, f3, f4], out_size=(H, W))
+
+    def inference_module(self):
+        """Ci-only copy of this network (see SINetInference)."""
+        return SINetInference(self).eval()
+
+
+class SINetInference(nn.Module):
+    """
+    Standalone Ci-only network built from a trained SINet: backbone,
+    rf2..rf4 and a FoldedPDC. forward(x) == SINet.predict(x). Used as the
+    starting point for quantized / compiled inference artifacts.
+
+    Weights and activations are kept channels_last (NHWC). The convs are
+    compute-bound on CPU, and merging the RF branches into wider convs only
+    adds FLOPs (see bench_rf.py). NHWC lets the four RF branches and the
+    backbone read each pixel's channels contiguously: ~20-30% faster, same
+    output.
+    """
+    def __init__(self, sinet):
+        super().__init__()
+        self.stem = copy.deepcopy(sinet.stem)
+        self.layer1 = copy.deepcopy(sinet.layer1)
+        self.layer2 = copy.deepcopy(sinet.layer2)
+        self.layer3 = copy.deepcopy(sinet.layer3)
+        self.layer4 = copy.deepcopy(sinet.layer4)
+        self.rf2 = copy.deepcopy(sinet.rf2)
+        self.rf3 = copy.deepcopy(sinet.rf3)
+        self.rf4 = copy.deepcopy(sinet.rf4)
+        self.pdc_i = FoldedPDC(sinet.pdc_i)
+        self.to(memory_format=torch.channels_last)
+
+    def forward(self, x):
+        out_size = [x.shape[2], x.shape[3]]
+
+        x = self.stem(x.contiguous(memory_format=torch.channels_last))
+        x1 = self.layer1(x)
+        x2 = self.layer2(x1)
+        x3 = self.layer3(x2)
+        x4 = self.layer4(x3)
+
+        return self.pdc_i([self.rf2(x2), self.rf3(x3), self.rf4(x4)], out_size)
+
+    def predict(self, x):
+        return self.forward(x)
+
 
 # -----------------------------------------
 #   get_model() + load_model()
 # -----------------------------------------
-def get_model(device="cpu"):
-    model = SINet().to(device)
+def get_model(device="cpu", pretrained=True, backbone=DEFAULT_BACKBONE):
+    model = SINet(pretrained=pretrained, backbone=backbone).to(device)
 
     # OPTIONAL SPEED TRICK: freeze backbone (only RF + PDC learn)
     for p in model.stem.parameters():
@@ -173,11 +306,32 @@ def get_model(device="cpu"):
     return model
 
 
-def load_model(weights_path=None, device="cpu"):
-    model = get_model(device=device)
+def model_checkpoint(model):
+    """What train.py saves: weights plus the backbone to rebuild them on."""
+    return {"state_dict": model.state_dict(), "backbone": model.backbone_name}
+
+
+def load_checkpoint(weights_path):
+    """
+    Memory-maps a checkpoint instead of reading it into RAM up front.
+    weights_only=True: plain tensors/containers only, no pickled code.
+    """
+    return torch.load(weights_path, map_location="cpu", mmap=True, weights_only=True)
+
+
+def load_model(weights_path=None, device="cpu", backbone=None):
+    """
+    backbone: architecture to build; by default the one recorded in the
+    checkpoint (checkpoints without one, and bare state_dicts, are ResNet18)
+    """
+    ckpt = load_checkpoint(weights_path) if weights_path else None
+    if backbone is None:
+        backbone = ckpt.get("backbone", DEFAULT_BACKBONE) if ckpt is not None else DEFAULT_BACKBONE
+
+    # ImageNet init is pointless when the checkpoint overwrites every weight
+    model = get_model(device=device, pretrained=ckpt is None, backbone=backbone)
 
-    if weights_path:
-        ckpt = torch.load(weights_path, map_location=device)
+    if ckpt is not None:
         if "state_dict" in ckpt:
             model.load_state_dict(ckpt["state_dict"])
         else:
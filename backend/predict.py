@@ -3,30 +3,73 @@ import torch
 import numpy as np
 import cv2
 from PIL import Image
-import torchvision.transforms as T
-from models.sinet import load_model
+from runtime import load_predictor
+from utils import letterbox, normalize_batch, unletterbox
+from tta import tta_predict_batch
+from instances import extract_instances, MIN_AREA
 
-transform = T.Compose([
-    T.Resize((352, 352)),
-    T.ToTensor(),
-    T.Normalize(mean=[0.485, 0.456, 0.406],
-                std=[0.229, 0.224, 0.225])
-])
+INPUT_SIZE = 352  # SINet training resolution
 
-def init_model(weights_path, device="cpu"):
-    return load_model(weights_path, device=device)
 
-def run_inference(model, pil_img, threshold=0.5):
+def init_model(weights_path, device="cpu", precision="fp32"):
+    # precision: "fp32", "bf16" (autocast) or "int8" (weights_path = quantized artifact)
+    # an export.py artifact is detected from the file and loaded as is
+    return load_predictor(weights_path, device=device, precision=precision)
+
+
+def preprocess(img, target_size=INPUT_SIZE, orig_size=None):
+    """
+    img: PIL image or RGB uint8 array of any size
+    orig_size: full-resolution (W, H) when img is a reduced decode (utils.decode_image);
+        outputs are then mapped back to that size
+    returns: letterboxed uint8 [S,S,3] (stackable across images), meta
+    """
+    if isinstance(img, Image.Image):
+        img = np.asarray(img.convert("RGB"))
+    return letterbox(img, target_size, orig_size)
+
+
+def predict_batch(model, batch, tta="none"):
+    """
+    batch: uint8 [B,S,S,3] from preprocess, numpy or torch
+    tta: test-time augmentation preset (see tta.TTA_PRESETS)
+    returns: Ci probabilities [B,1,S,S]
+    """
+    if tta != "none":
+        return tta_predict_batch(model, batch, tta)
+    return model.predict(normalize_batch(batch))
+
+
+def prob_map(prob, meta):
+    # prob: Ci for one image, values 0..1
+    # returns: uint8 0..255 probability map at the original image resolution
+    # (1 byte/pixel, so it is cheap to keep around for re-thresholding)
+    prob = unletterbox(prob, meta)
+    return np.rint(prob * 255).astype(np.uint8)
+
+
+def threshold_map(prob_u8, threshold=0.5):
+    # prob_u8: from prob_map; returns: uint8 0/255 mask
+    return (prob_u8 > threshold * 255).astype(np.uint8) * 255
+
+
+def postprocess(prob, meta, threshold=0.5):
+    # returns: uint8 0/255 mask at the original image resolution
+    return threshold_map(prob_map(prob, meta), threshold)
+
+
+def run_inference(model, pil_img, threshold=0.5, tta="none", return_prob=False):
+    # return_prob: also return the uint8 probability map, so other thresholds
+    # can be applied with threshold_map() without running the model again
     model.eval()
 
-    img_tensor = transform(pil_img).unsqueeze(0)
+    img, meta = preprocess(pil_img)
     with torch.no_grad():
-        Ci, Cs = model(img_tensor)
+        Ci = predict_batch(model, img[None], tta)
 
-    mask = Ci.squeeze().cpu().numpy()
-    mask = (mask > threshold).astype(np.uint8) * 255
-
-    return mask
+    prob = prob_map(Ci[0], meta)
+    mask = threshold_map(prob, threshold)
+    return (mask, prob) if return_prob else mask
 
 
 # ------------------ EXTRA VISUALIZATIONS ------------------
@@ -40,15 +83,15 @@ def make_overlay(original, mask):
     return overlay
 
 
-def make_bounding_box(original, mask):
+def make_bounding_box(original, mask, instances=None):
+    # one box per detected instance (see instances.extract_instances)
     orig = np.array(original).copy()
-    ys, xs = np.where(mask > 0)
-
-    if len(xs) == 0:
-        return orig  # No detection
+    if instances is None:
+        instances = extract_instances(mask)
 
-    x1, y1, x2, y2 = min(xs), min(ys), max(xs), max(ys)
-    cv2.rectangle(orig, (x1, y1), (x2, y2), (0, 255, 0), 3)
+    for inst in instances:
+        x, y, w, h = inst["box"]
+        cv2.rectangle(orig, (x, y), (x + w - 1, y + h - 1), (0, 255, 0), 3)
 
     return orig
 
@@ -64,3 +107,41 @@ def side_by_side(original, mask, overlay):
 
     combined = np.hstack((orig, mask_rgb, overlay))
     return combined
+
+
+OUTPUTS = ["mask", "overlay", "bounding_box", "heatmap", "combined", "probability", "instances"]
+# outputs that draw on the original image (the others only need the probability map)
+NEEDS_ORIGINAL = {"overlay", "bounding_box", "combined"}
+
+
+def render(original, mask, outputs, prob=None, min_area=MIN_AREA, contours=False):
+    """
+    Builds only the requested visuals (see OUTPUTS).
+    prob: uint8 probability map from prob_map, needed for "probability"
+    (and for instance scores)
+    min_area, contours: see instances.extract_instances
+    returns: dict name -> uint8 array; "instances" -> list of dicts
+    """
+    done = {"mask": mask}
+    if prob is not None:
+        done["probability"] = prob
+
+    def get(kind):
+        if kind not in done:
+            if kind == "overlay":
+                done[kind] = make_overlay(original, mask)
+            elif kind == "instances":
+                done[kind] = extract_instances(mask, prob, min_area, contours)
+            elif kind == "bounding_box":
+                done[kind] = make_bounding_box(original, mask, get("instances"))
+            elif kind == "heatmap":
+                done[kind] = make_heatmap(mask)
+            elif kind == "combined":
+                done[kind] = side_by_side(original, mask, get("overlay"))
+            elif kind == "probability":
+                raise ValueError("the probability output needs prob")
+            else:
+                raise ValueError(f"unknown output: {kind}")
+        return done[kind]
+
+    return {kind: get(kind) for kind in outputs}
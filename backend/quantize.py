@@ -0,0 +1,74 @@
+# backend/quantize.py
+# int8 post-training static quantization (FX graph mode) of the Ci-only
+# network (backbone + rf2..rf4 + folded PDC), calibrated on a few
+# COD10KDataset samples and saved as a TorchScript artifact.
+# (bf16 autocast and loading of the artifacts live in runtime.py)
+#
+#   python quantize.py --weights weights/sinet.pth \
+#       --calib-images DIR --calib-masks DIR [--samples 32] [--out weights/sinet_int8.pt]
+import os
+import argparse
+import torch
+from torch.utils.data import DataLoader
+
+from dataset import COD10KDataset
+from models.sinet import load_model
+from runtime import QUANT_BACKEND
+
+
+# -----------------------------------------
+#   int8 static quantization
+# -----------------------------------------
+def quantize_int8(model, calib_batches):
+    """
+    model: trained SINet
+    calib_batches: iterable of normalized [B,3,H,W] tensors
+    returns: quantized Ci-only GraphModule (fp32 in, fp32 out)
+    """
+    from torch.ao.quantization import get_default_qconfig_mapping
+    from torch.ao.quantization.quantize_fx import prepare_fx, convert_fx
+
+    torch.backends.quantized.engine = QUANT_BACKEND
+    net = model.inference_module()
+    example = (torch.zeros(1, 3, 352, 352),)
+    prepared = prepare_fx(net, get_default_qconfig_mapping(QUANT_BACKEND), example)
+
+    # calibration: observers record activation ranges
+    with torch.no_grad():
+        for x in calib_batches:
+            prepared(x)
+
+    return convert_fx(prepared)
+
+
+def save_quantized(qmodel, path):
+    """Saves as frozen TorchScript: loadable without this code or torchvision."""
+    with torch.no_grad():
+        traced = torch.jit.trace(qmodel, torch.zeros(1, 3, 352, 352))
+    torch.jit.save(torch.jit.freeze(traced), path)
+
+
+def calibration_batches(image_dir, mask_dir, samples=32, batch_size=8):
+    ds = COD10KDataset(image_dir, mask_dir, target_size=352, max_samples=samples)
+    for img, _ in DataLoader(ds, batch_size=batch_size, shuffle=False):
+        yield img
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--weights", default=os.path.join("weights", "sinet.pth"))
+    parser.add_argument("--calib-images", required=True)
+    parser.add_argument("--calib-masks", required=True)
+    parser.add_argument("--samples", type=int, default=32, help="calibration images")
+    parser.add_argument("--out", default=os.path.join("weights", "sinet_int8.pt"))
+    args = parser.parse_args()
+
+    model = load_model(args.weights)
+    print(f"📌 Calibrating on {args.samples} images...")
+    qmodel = quantize_int8(model, calibration_batches(args.calib_images, args.calib_masks, args.samples))
+    save_quantized(qmodel, args.out)
+    print(f"💾 int8 model saved to: {args.out} ({os.path.getsize(args.out) / 2**20:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
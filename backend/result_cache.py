@@ -0,0 +1,228 @@
+# backend/result_cache.py
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+def model_version(weights_path, precision):
+    """Changes whenever the weights file is replaced or served at another precision."""
+    st = os.stat(weights_path)
+    ident = f"{os.path.abspath(weights_path)}|{st.st_size}|{st.st_mtime_ns}|{precision}"
+    return hashlib.sha1(ident.encode()).hexdigest()[:16]
+
+
+def result_key(contents, version, params):
+    """
+    contents: raw uploaded bytes
+    version: model_version() of the serving model
+    params: dict of everything else that changes the response (threshold, outputs, ...)
+    """
+    h = hashlib.sha256(contents)
+    h.update(version.encode())
+    h.update(json.dumps(params, sort_keys=True).encode())
+    return h.hexdigest()
+
+
+class ResultCache:
+    """
+    Content-addressed cache of encoded /predict responses.
+
+    Memory tier: LRU bounded by the total size of the cached bodies.
+    Disk tier (optional): one file per key in `disk_dir`, also LRU-bounded by
+    bytes; a disk hit is promoted back into memory. Entries survive restarts
+    because the key already includes the model version.
+
+    Values are (body bytes, media_type). Thread-safe.
+    """
+    def __init__(self, max_bytes=256 * 2**20, disk_dir=None, disk_max_bytes=2 * 2**30):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+
+        self._lock = threading.Lock()
+        self._mem = OrderedDict()   # key -> (body, media_type)
+        self._mem_bytes = 0
+        self._disk = OrderedDict()  # key -> file size, oldest first
+        self._disk_bytes = 0
+        self._counts = {"hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0, "disk_evictions": 0}
+
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+            entries = [e for e in os.scandir(disk_dir) if e.is_file() and not e.name.endswith(".tmp")]
+            for e in sorted(entries, key=lambda e: e.stat().st_mtime_ns):
+                self._disk[e.name] = e.stat().st_size
+                self._disk_bytes += e.stat().st_size
+
+    # ------------------ PUBLIC API ------------------
+
+    def get(self, key):
+        """returns: (body, media_type) or None"""
+        with self._lock:
+            if key in self._mem:
+                self._mem.move_to_end(key)
+                self._counts["hits"] += 1
+                return self._mem[key]
+            on_disk = key in self._disk
+
+        value = self._disk_read(key) if on_disk else None
+        with self._lock:
+            if value is None:
+                if on_disk and key in self._disk:  # file went missing
+                    self._disk_bytes -= self._disk.pop(key)
+                self._counts["misses"] += 1
+                return None
+            self._counts["disk_hits"] += 1
+            self._disk.move_to_end(key)
+            self._mem_put(key, value)
+        return value
+
+    def put(self, key, body, media_type):
+        value = (body, media_type)
+        with self._lock:
+            self._mem_put(key, value)
+        if self.disk_dir:
+            self._disk_write(key, value)
+
+    def stats(self):
+        with self._lock:
+            lookups = self._counts["hits"] + self._counts["disk_hits"] + self._counts["misses"]
+            return {
+                **self._counts,
+                "hit_rate": (lookups - self._counts["misses"]) / lookups if lookups else 0.0,
+                "entries": len(self._mem),
+                "bytes": self._mem_bytes,
+                "max_bytes": self.max_bytes,
+                "disk_entries": len(self._disk),
+                "disk_bytes": self._disk_bytes,
+            }
+
+    # ------------------ INTERNALS ------------------
+
+    def _mem_put(self, key, value):
+        # caller holds the lock
+        size = len(value[0])
+        if size > self.max_bytes:
+            return
+        if key in self._mem:
+            self._mem_bytes -= len(self._mem.pop(key)[0])
+        self._mem[key] = value
+        self._mem_bytes += size
+        while self._mem_bytes > self.max_bytes:
+            _, (old, _) = self._mem.popitem(last=False)
+            self._mem_bytes -= len(old)
+            self._counts["evictions"] += 1
+
+    # file layout: media type, newline, body
+    def _disk_read(self, key):
+        try:
+            with open(os.path.join(self.disk_dir, key), "rb") as f:
+                media_type, body = f.read().split(b"\n", 1)
+        except (OSError, ValueError):
+            return None
+        return body, media_type.decode()
+
+    def _disk_write(self, key, value):
+        body, media_type = value
+        path = os.path.join(self.disk_dir, key)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(media_type.encode() + b"\n")
+            f.write(body)
+        os.replace(tmp, path)  # atomic: readers never see a partial file
+
+        size = len(body) + len(media_type) + 1
+        evicted = []
+        with self._lock:
+            if key in self._disk:
+                self._disk_bytes -= self._disk.pop(key)
+            self._disk[key] = size
+            self._disk_bytes += size
+            while self._disk_bytes > self.disk_max_bytes and len(self._disk) > 1:
+                old, old_size = self._disk.popitem(last=False)
+                self._disk_bytes -= old_size
+                self._counts["disk_evictions"] += 1
+                evicted.append(old)
+
+        for old in evicted:
+            try:
+                os.remove(os.path.join(self.disk_dir, old))
+            except OSError:
+                pass
+
+
+class ProbMapCache:
+    """
+    Short-lived store of per-request probability maps, so a result can be
+    re-thresholded / re-rendered without another forward pass.
+
+    Values are (upload bytes, uint8 probability map): the upload is kept
+    encoded and only decoded again when a visual needs the original image.
+    Entries expire after `ttl_s`; the total size is capped at `max_bytes`
+    (least recently used first). Thread-safe.
+    """
+    def __init__(self, max_bytes=256 * 2**20, ttl_s=300):
+        self.max_bytes = max_bytes
+        self.ttl = ttl_s
+
+        self._lock = threading.Lock()
+        self._items = OrderedDict()  # request_id -> (expires, contents, prob)
+        self._bytes = 0
+        self._counts = {"hits": 0, "misses": 0, "evictions": 0, "expired": 0}
+
+    def get(self, request_id):
+        """returns: (contents, prob) or None"""
+        with self._lock:
+            self._expire()
+            item = self._items.get(request_id)
+            if item is None:
+                self._counts["misses"] += 1
+                return None
+            self._items.move_to_end(request_id)
+            self._counts["hits"] += 1
+            return item[1], item[2]
+
+    def __contains__(self, request_id):
+        # membership only: doesn't count as a hit or miss, or refresh the LRU order
+        with self._lock:
+            self._expire()
+            return request_id in self._items
+
+    def put(self, request_id, contents, prob):
+        size = len(contents) + prob.nbytes
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            self._expire()
+            if request_id in self._items:
+                self._drop(request_id)
+            self._items[request_id] = (time.monotonic() + self.ttl, contents, prob)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                self._drop(next(iter(self._items)))
+                self._counts["evictions"] += 1
+
+    def stats(self):
+        with self._lock:
+            self._expire()
+            return {
+                **self._counts,
+                "entries": len(self._items),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "ttl_s": self.ttl,
+            }
+
+    # caller holds the lock
+    def _drop(self, request_id):
+        _, contents, prob = self._items.pop(request_id)
+        self._bytes -= len(contents) + prob.nbytes
+
+    def _expire(self):
+        now = time.monotonic()
+        stale = [k for k, (expires, _, _) in self._items.items() if expires <= now]
+        for k in stale:
+            self._drop(k)
+        self._counts["expired"] += len(stale)
@@ -0,0 +1,83 @@
+# backend/runtime.py
+# Loads whatever the server / CLIs should run, behind one interface: a module
+# with .predict(x) -> Ci, like SINet.predict.
+#
+#   SINet checkpoint (.pth)   -> fp32: SINet.inference_module() (folded PDC,
+#                                channels_last); bf16: eager SINet under autocast
+#   TorchScript artifact      -> from export.py (fp32) or quantize.py (int8);
+#                                needs neither torchvision nor models/
+import zipfile
+import torch
+import torch.nn as nn
+
+PRECISIONS = ["fp32", "bf16", "int8"]
+QUANT_BACKEND = "x86"  # "qnnpack" on ARM
+
+
+class ScriptedPredictor(nn.Module):
+    """Wraps a loaded TorchScript Ci-only module so callers can use .predict."""
+    def __init__(self, module):
+        super().__init__()
+        self.module = module
+
+    def forward(self, x):
+        return self.module(x)
+
+    def predict(self, x):
+        return self.module(x)
+
+
+class Bf16Predictor(nn.Module):
+    """Runs a SINet under CPU bf16 autocast; outputs are returned as fp32."""
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, x):
+        with torch.autocast("cpu", dtype=torch.bfloat16):
+            return tuple(out.float() for out in self.model(x))
+
+    def predict(self, x):
+        with torch.autocast("cpu", dtype=torch.bfloat16):
+            return self.model.predict(x).float()
+
+
+def bf16_supported():
+    try:
+        return torch.ops.mkldnn._is_mkldnn_bf16_supported()
+    except (AttributeError, RuntimeError):
+        return False
+
+
+def is_torchscript(path):
+    """TorchScript archives carry a code/ directory; plain checkpoints don't."""
+    if not zipfile.is_zipfile(path):
+        return False
+    with zipfile.ZipFile(path) as zf:
+        return any("/code/" in name for name in zf.namelist())
+
+
+def load_scripted(path):
+    torch.backends.quantized.engine = QUANT_BACKEND  # for int8 artifacts
+    return ScriptedPredictor(torch.jit.load(path, map_location="cpu")).eval()
+
+
+def load_predictor(weights_path, device="cpu", precision="fp32"):
+    """
+    fp32/bf16: weights_path is a SINet checkpoint or an export.py artifact.
+    int8: weights_path is an artifact written by quantize.py.
+    returns: a module with .predict(x) -> Ci
+    """
+    if precision not in PRECISIONS:
+        raise ValueError(f"precision must be one of {PRECISIONS}")
+
+    if precision == "int8" or (weights_path and is_torchscript(weights_path)):
+        return load_scripted(weights_path)
+
+    from models.sinet import load_model  # imports torchvision, so only when needed
+    model = load_model(weights_path, device=device)
+    if precision == "bf16":
+        if bf16_supported():
+            return Bf16Predictor(model).eval()
+        print("⚠️ CPU has no native bf16 support, running fp32")
+    return model.inference_module()
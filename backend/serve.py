@@ -0,0 +1,144 @@
+# backend/serve.py
+# Pre-fork server. The model is loaded once, in this process, and the
+# workers are forked from it and share one listening socket:
+#   - weights are shared copy-on-write: nothing writes to them after loading,
+#     so N workers cost about one model plus per-worker activations, instead
+#     of N checkpoint loads with `uvicorn --workers N`
+#   - each worker pins torch's intra-op pool to its share of the cores
+#     (optionally to its own cores), so workers don't oversubscribe the CPU
+#   - each worker runs a warm-up forward before it accepts connections
+# A worker that dies is forked again from the (still loaded) parent.
+#
+#   python serve.py [--host 127.0.0.1] [--port 8000] [--workers 4]
+#       [--threads N] [--affinity]
+#
+# Needs fork (Linux / macOS). Environment variables are the same as server.py.
+import os
+import gc
+import sys
+import time
+import signal
+import socket
+import argparse
+
+import torch
+
+# a worker that dies sooner than this after forking is not forked again
+# (a crash at startup would only repeat)
+MIN_UPTIME_S = 10
+
+
+def available_cores():
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def run_worker(sock, host, port, threads, cores):
+    # runs in the forked child; never returns
+    import uvicorn
+    import server
+
+    if cores and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cores)
+    torch.set_num_threads(threads)
+    server.warm_up()
+    print(f"✅ Worker {os.getpid()} ready (threads={threads}, cores={cores or 'any'})", flush=True)
+
+    config = uvicorn.Config(server.app, host=host, port=port)
+    uvicorn.Server(config).run(sockets=[sock])
+    os._exit(0)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--threads", type=int, default=None,
+                        help="intra-op threads per worker (default: cores / workers)")
+    parser.add_argument("--affinity", action="store_true",
+                        help="bind each worker to its own slice of the cores")
+    args = parser.parse_args()
+
+    if not hasattr(os, "fork"):
+        sys.exit("serve.py needs fork(); use `uvicorn server:app` on this platform")
+
+    cores = available_cores()
+    threads = args.threads or max(1, len(cores) // args.workers)
+    slices = [None] * args.workers
+    if args.affinity:
+        if threads * args.workers <= len(cores):
+            slices = [cores[i * threads:(i + 1) * threads] for i in range(args.workers)]
+        else:
+            print(f"⚠️ {args.workers} workers x {threads} threads > {len(cores)} cores; not pinning")
+
+    # The parent never runs a parallel region: an OpenMP pool started before
+    # fork() is not usable in the children. Each worker sizes its own pool.
+    torch.set_num_threads(1)
+    import server  # loads the model, once
+
+    # Move everything loaded so far out of the GC's reach: collections in the
+    # workers would otherwise write to (and un-share) every tracked object
+    gc.collect()
+    gc.freeze()
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((args.host, args.port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+
+    workers = {}  # pid -> (worker index, fork time)
+    stopping = False
+
+    def spawn(i):
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            try:
+                run_worker(sock, args.host, args.port, threads, slices[i])
+            finally:
+                os._exit(1)
+        workers[pid] = (i, time.monotonic())
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    print(f"📌 Forking {args.workers} workers on http://{args.host}:{args.port} "
+          f"({threads} threads each, model {server.WEIGHTS_PATH}, {server.PRECISION})")
+    for i in range(args.workers):
+        spawn(i)
+
+    while workers:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        entry = workers.pop(pid, None)
+        if entry is None or stopping:
+            continue
+        i, forked = entry
+        if time.monotonic() - forked < MIN_UPTIME_S:
+            print(f"⚠️ Worker {pid} exited during startup (status {status}); shutting down")
+            stop(None, None)
+            continue
+        print(f"⚠️ Worker {pid} exited (status {status}); forking a new one")
+        spawn(i)
+
+    sock.close()
+    print("✅ All workers stopped")
+
+
+if __name__ == "__main__":
+    main()
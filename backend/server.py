@@ -1,16 +1,73 @@
 # backend/server.py
 import io
-from fastapi import FastAPI, UploadFile, File
-from fastapi.responses import StreamingResponse
+import os
+import json
+import base64
+import shutil
+import asyncio
+import zipfile
+import tempfile
+import threading
+import cv2
+import numpy as np
+import torch
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import FastAPI, UploadFile, File, Query, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi.responses import Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from predict import (
-    init_model, run_inference,
-    make_overlay, make_bounding_box,
-    make_heatmap, side_by_side
+    INPUT_SIZE, init_model, preprocess, predict_batch, prob_map, threshold_map, render,
+    OUTPUTS, NEEDS_ORIGINAL,
 )
+from batching import MicroBatcher
+from tiling import run_tiled_prob
+from cascade import run_cascade_prob
+from tta import TTA_PRESETS
+from instances import MIN_AREA, extract_instances
+from utils import decode_image
+from video import TemporalMasker, read_frames
+from result_cache import ResultCache, ProbMapCache, model_version, result_key
 from PIL import Image
 
-WEIGHTS_PATH = r"D:\Camo spotter 3\Camo-spotter-2\backend\weights\sinet.pth"
+WEIGHTS_PATH = os.environ.get(
+    "SINET_WEIGHTS", r"D:\Camo spotter 3\Camo-spotter-2\backend\weights\sinet.pth"
+)
+# SINET_WEIGHTS may also be an export.py artifact (TorchScript, no torchvision needed)
+# "fp32", "bf16" or "int8" (then SINET_WEIGHTS must point to quantize.py output)
+PRECISION = os.environ.get("SINET_PRECISION", "fp32")
+
+# Micro-batching: concurrent uploads are grouped into one forward pass
+MAX_BATCH_SIZE = 8
+MAX_WAIT_MS = 10
+
+# Decode / render / PNG encode run on this pool, never on the event loop
+CPU_WORKERS = 4
+# Requests admitted at once; beyond this /predict answers 503 right away
+MAX_IN_FLIGHT = 32
+
+# Allowed ?tile= sizes for tiled inference
+MIN_TILE = 128
+MAX_TILE = 2048
+
+# Upper bound of ?cascade= (forwards per request, coarse pass included)
+MAX_CASCADE_FORWARDS = 32
+
+# Encoded responses keyed by upload hash + model version + params; 0 = off.
+# SINET_RESULT_CACHE_DIR adds an on-disk tier that survives restarts.
+RESULT_CACHE_MB = int(os.environ.get("SINET_RESULT_CACHE_MB", "256"))
+RESULT_CACHE_DIR = os.environ.get("SINET_RESULT_CACHE_DIR")
+RESULT_CACHE_DISK_MB = int(os.environ.get("SINET_RESULT_CACHE_DISK_MB", "2048"))
+
+# Probability maps kept for GET /render/{request_id} (re-threshold without a forward)
+PROB_CACHE_MB = int(os.environ.get("SINET_PROB_CACHE_MB", "256"))
+PROB_CACHE_TTL_S = int(os.environ.get("SINET_PROB_CACHE_TTL_S", "300"))
+
+MEDIA_TYPES = {"png": "image/png", "json": "application/json"}
+
+# Video / frame streams: frames per forward, and temporal reuse defaults
+VIDEO_BATCH_SIZE = 8
+VIDEO_SKIP_THRESHOLD = 0.005  # fraction of a 64x64 thumbnail that changed (see video.py)
+VIDEO_SMOOTHING = 0.6       # EMA weight of the newest frame
 
 
 app = FastAPI()
@@ -21,40 +78,439 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Request-ID", "X-Cache"],
 )
 
 print("Loading model...")
-model = init_model(WEIGHTS_PATH)
+model = init_model(WEIGHTS_PATH, precision=PRECISION)
+cpu_pool = ThreadPoolExecutor(CPU_WORKERS, thread_name_prefix="cpu")
+MODEL_VERSION = model_version(WEIGHTS_PATH, PRECISION)
+result_cache = ResultCache(
+    RESULT_CACHE_MB * 2**20, RESULT_CACHE_DIR, RESULT_CACHE_DISK_MB * 2**20
+) if RESULT_CACHE_MB > 0 else None
+prob_cache = ProbMapCache(
+    PROB_CACHE_MB * 2**20, PROB_CACHE_TTL_S
+) if PROB_CACHE_MB > 0 else None
 print("Model ready.")
 
+load = {"in_flight": 0, "rejected": 0}
+cascade_stats = {"requests": 0, "forwards": 0, "refined": 0}
+
+# one batcher per TTA preset, so only requests with the same views share a forward
+batchers = {}
+
+
+def get_batcher(tta):
+    if tta not in batchers:
+        cfg = TTA_PRESETS[tta]
+        views = len(cfg["scales"]) * (2 if cfg["flip"] else 1)
+        batchers[tta] = MicroBatcher(
+            lambda batch: predict_batch(model, batch, tta),  # Ci only, skips the coarse Cs branch
+            max_batch_size=max(1, MAX_BATCH_SIZE // views),  # bound views per forward
+            max_wait_ms=MAX_WAIT_MS,
+        )
+    return batchers[tta]
+
+
+def warm_up():
+    """
+    One dummy forward per batch size the batcher can form, so the first real
+    requests don't pay for allocator / kernel setup. serve.py runs this in
+    every worker before it accepts connections.
+    """
+    with torch.no_grad():
+        for b in sorted({1, MAX_BATCH_SIZE}):
+            predict_batch(model, np.zeros((b, INPUT_SIZE, INPUT_SIZE, 3), np.uint8))
+
+
+@app.on_event("shutdown")
+def shutdown():
+    for b in batchers.values():
+        b.close()
+    cpu_pool.shutdown()
+
+
+async def run_cpu(fn, *args):
+    return await asyncio.get_running_loop().run_in_executor(cpu_pool, fn, *args)
+
 
 def to_png_bytes(img_np):
     pil = Image.fromarray(img_np)
     buf = io.BytesIO()
     pil.save(buf, format="PNG")
-    buf.seek(0)
-    return buf
+    return buf.getvalue()
+
+
+def parse_outputs(outputs):
+    names = [o.strip() for o in outputs.split(",") if o.strip()]
+    unknown = [o for o in names if o not in OUTPUTS]
+    if not names or unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"outputs must be a comma-separated subset of {OUTPUTS}",
+        )
+    return list(dict.fromkeys(names))  # de-duplicate, keep order
+
+
+def bundle(files):
+    """
+    files: dict filename -> bytes ("mask.png", "instances.json", ...)
+    One file -> returned as is; several -> uncompressed zip (PNGs are already compressed).
+    returns: (body, media_type)
+    """
+    if len(files) == 1:
+        filename, data = next(iter(files.items()))
+        return data, MEDIA_TYPES[filename.rsplit(".", 1)[1]]
+
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_STORED) as zf:
+        for filename, data in files.items():
+            zf.writestr(filename, data)
+    return buf.getvalue(), "application/zip"
+
+
+def request_id(contents, tile, overlap, tta, cascade=0):
+    # same upload + model + inference settings -> same probability map, same id
+    params = {"tile": tile, "overlap": overlap if tile else 0, "tta": tta}
+    if cascade:
+        params["cascade"] = cascade
+    return result_key(contents, MODEL_VERSION, params)
+
+
+def response_key(rid, names, threshold, min_area, contours):
+    params = {"outputs": names, "threshold": threshold}
+    if "instances" in names or "bounding_box" in names:
+        params.update(min_area=min_area, contours=contours)
+    return result_key(rid.encode(), MODEL_VERSION, params)
+
+
+def make_response(body, media_type, cache_status, rid):
+    headers = {"X-Cache": cache_status, "X-Request-ID": rid}
+    if media_type == "application/zip":
+        headers["Content-Disposition"] = 'attachment; filename="prediction.zip"'
+    return Response(content=body, media_type=media_type, headers=headers)
+
+
+# ------------------ CPU STAGES (run on cpu_pool) ------------------
+
+def decode(contents, letterboxed=True, full=True):
+    # full=False: only the model input is needed, so JPEGs are decoded at a
+    # reduced scale (utils.decode_image); original is then None, and meta
+    # still maps the outputs back to the full resolution
+    try:
+        original, size = decode_image(io.BytesIO(contents), None if full else INPUT_SIZE)
+    except (OSError, Image.DecompressionBombError):
+        # not an image (UnidentifiedImageError is an OSError), truncated or corrupt
+        # data, or more pixels than PIL's decompression-bomb limit
+        raise HTTPException(status_code=400, detail="file is not a supported image")
+    if not letterboxed:
+        return original, None, None
+    img, meta = preprocess(original, orig_size=size)
+    return original if full else None, torch.from_numpy(img), meta
+
+
+def encode(original, prob, names, threshold, min_area, contours):
+    # VISUALS: only the requested ones are rendered and encoded
+    mask = threshold_map(prob, threshold)
+    visuals = render(original, mask, names, prob, min_area, contours)
+    files = {}
+    for name, out in visuals.items():
+        if name == "instances":
+            files["instances.json"] = json.dumps({
+                "threshold": threshold,
+                "min_area": min_area,
+                "size": [mask.shape[1], mask.shape[0]],
+                "instances": out,
+            }).encode()
+        else:
+            files[f"{name}.png"] = to_png_bytes(out)
+    return bundle(files)
+
+
+def rerender(contents, prob, names, *args):
+    original = decode(contents, letterboxed=False)[0] if NEEDS_ORIGINAL.intersection(names) else None
+    return encode(original, prob, names, *args)
 
 
 @app.post("/predict")
-async def predict(file: UploadFile = File(...)):
+async def predict(
+    file: UploadFile = File(...),
+    outputs: str = Query("mask", description=f"comma-separated subset of {OUTPUTS}"),
+    tile: int = Query(0, ge=0, description="tile size (px) for tiled inference on large images; 0 = off"),
+    overlap: int = Query(64, ge=0, description="tile overlap (px)"),
+    tta: str = Query("none", description=f"test-time augmentation preset: {list(TTA_PRESETS)}"),
+    cascade: int = Query(0, ge=0, le=MAX_CASCADE_FORWARDS,
+                         description="coarse-to-fine: refine candidate regions, at most this many forwards; 0 = off"),
+    threshold: float = Query(0.5, gt=0, lt=1, description="mask threshold on the Ci probability"),
+    min_area: int = Query(MIN_AREA, ge=0, description="instances/boxes: drop components below this many px"),
+    contours: bool = Query(False, description="instances: include each instance's polygon"),
+):
+    names = parse_outputs(outputs)
+    if tta not in TTA_PRESETS:
+        raise HTTPException(status_code=400, detail=f"tta must be one of {list(TTA_PRESETS)}")
+    if tile and tta != "none":
+        raise HTTPException(status_code=400, detail="tta is not supported with tiled inference")
+    if cascade and (tile or tta != "none"):
+        raise HTTPException(status_code=400, detail="cascade can't be combined with tile or tta")
+    if tile and not (MIN_TILE <= tile <= MAX_TILE and overlap < tile):
+        raise HTTPException(
+            status_code=400,
+            detail=f"tile must be in [{MIN_TILE}, {MAX_TILE}] and larger than overlap",
+        )
+
+    # repeat uploads skip decode, inference and encoding (and are never shed),
+    # unless their probability map has expired: the miss path stores it again
+    # so /render keeps working for the X-Request-ID returned
     contents = await file.read()
-    original = Image.open(io.BytesIO(contents)).convert("RGB")
+    rid = await run_cpu(request_id, contents, tile, overlap, tta, cascade)
+    key = response_key(rid, names, threshold, min_area, contours)
+    if result_cache is not None and (prob_cache is None or rid in prob_cache):
+        cached = await run_cpu(result_cache.get, key)
+        if cached is not None:
+            return make_response(*cached, "hit", rid)
+
+    # backpressure: shed load instead of queueing without bound
+    if load["in_flight"] >= MAX_IN_FLIGHT:
+        load["rejected"] += 1
+        raise HTTPException(status_code=503, detail="server busy", headers={"Retry-After": "1"})
+
+    load["in_flight"] += 1
+    try:
+        # full-resolution decode only for tiling / cascade and visuals drawn on the upload
+        full = bool(tile or cascade) or bool(NEEDS_ORIGINAL.intersection(names))
+        original, img, meta = await run_cpu(decode, contents, not (tile or cascade), full)
+
+        if tile:
+            # tiles are batched inside run_tiled_prob; bypasses the batcher
+            prob = await run_cpu(run_tiled_prob, model, original, tile, overlap)
+        elif cascade:
+            # coarse pass + batched crops inside run_cascade_prob; bypasses the batcher
+            prob, info = await run_cpu(run_cascade_prob, model, original, cascade)
+            cascade_stats["requests"] += 1
+            cascade_stats["forwards"] += info["forwards"]
+            cascade_stats["refined"] += info["refined"]
+        else:
+            # Ci (batched with other in-flight requests)
+            ci = await get_batcher(tta).infer(img)
+            # full-resolution probability map, aligned with the original upload
+            prob = await run_cpu(prob_map, ci, meta)
+
+        if prob_cache is not None:
+            prob_cache.put(rid, contents, prob)
+
+        body, media_type = await run_cpu(encode, original, prob, names, threshold, min_area, contours)
+        if result_cache is not None:
+            await run_cpu(result_cache.put, key, body, media_type)
+        return make_response(body, media_type, "miss", rid)
+    finally:
+        load["in_flight"] -= 1
+
+
+@app.get("/render/{request_id}")
+async def render_again(
+    request_id: str,
+    outputs: str = Query("mask", description=f"comma-separated subset of {OUTPUTS}"),
+    threshold: float = Query(0.5, gt=0, lt=1, description="mask threshold on the Ci probability"),
+    min_area: int = Query(MIN_AREA, ge=0, description="instances/boxes: drop components below this many px"),
+    contours: bool = Query(False, description="instances: include each instance's polygon"),
+):
+    """Re-thresholds / re-renders an earlier /predict result (X-Request-ID) without a forward pass."""
+    names = parse_outputs(outputs)
+    key = response_key(request_id, names, threshold, min_area, contours)
+    if result_cache is not None:
+        cached = await run_cpu(result_cache.get, key)
+        if cached is not None:
+            return make_response(*cached, "hit", request_id)
+
+    entry = prob_cache.get(request_id) if prob_cache is not None else None
+    if entry is None:
+        raise HTTPException(status_code=404, detail="unknown or expired request id; POST to /predict again")
+
+    body, media_type = await run_cpu(rerender, *entry, names, threshold, min_area, contours)
+    if result_cache is not None:
+        await run_cpu(result_cache.put, key, body, media_type)
+    return make_response(body, media_type, "miss", request_id)
+
+
+# ------------------ VIDEO / FRAME STREAMS ------------------
+
+def frame_results(start, results, threshold, min_area, masks):
+    """One JSON line per frame: instances, foreground coverage, optional mask PNG."""
+    lines = []
+    for i, (prob, reused) in enumerate(results):
+        mask = threshold_map(prob, threshold)
+        out = {
+            "frame": start + i,
+            "reused": reused,
+            "coverage": float(np.count_nonzero(mask)) / mask.size,
+            "instances": extract_instances(mask, prob, min_area),
+        }
+        if masks:
+            out["mask"] = base64.b64encode(to_png_bytes(mask)).decode()
+        lines.append(json.dumps(out))
+    return lines
+
+
+def open_video(upload):
+    # cv2 decodes from a path, so the upload is spooled to a temp file first
+    suffix = os.path.splitext(upload.filename or "")[1]
+    tmp = tempfile.NamedTemporaryFile(suffix=suffix, delete=False)
+    with tmp:
+        shutil.copyfileobj(upload.file, tmp)
+    cap = cv2.VideoCapture(tmp.name)
+    if not cap.isOpened():
+        cap.release()
+        os.remove(tmp.name)
+        raise HTTPException(status_code=400, detail="file is not a supported video")
+    return cap, tmp.name
 
-    # MASK
-    mask = run_inference(model, original)
 
-    # VISUALS
-    overlay = make_overlay(original, mask)
-    bbox = make_bounding_box(original, mask)
-    heatmap = make_heatmap(mask)
-    combined = side_by_side(original, mask, overlay)
+def close_video(cap, path):
+    cap.release()
+    os.remove(path)
 
+
+def decode_frames(messages):
+    frames = []
+    for data in messages:
+        bgr = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+        if bgr is None:
+            raise ValueError("frame is not a supported image")
+        frames.append(cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB))
+    return frames
+
+
+@app.post("/predict/video")
+async def predict_video(
+    file: UploadFile = File(...),
+    threshold: float = Query(0.5, gt=0, lt=1),
+    skip: float = Query(VIDEO_SKIP_THRESHOLD, ge=0, le=1,
+                        description="reuse Ci while less than this fraction of the frame changed; 0 = every frame"),
+    smoothing: float = Query(VIDEO_SMOOTHING, gt=0, le=1, description="EMA weight of the newest frame; 1 = off"),
+    min_area: int = Query(MIN_AREA, ge=0),
+    masks: bool = Query(False, description="include each frame's mask as base64 PNG"),
+):
+    """
+    Streams one NDJSON line per frame as soon as its batch is done, then a
+    final {"done": true, ...} line with reuse counts.
+    """
+    if load["in_flight"] >= MAX_IN_FLIGHT:
+        load["rejected"] += 1
+        raise HTTPException(status_code=503, detail="server busy", headers={"Retry-After": "1"})
+
+    cap, path = await run_cpu(open_video, file)
+    masker = TemporalMasker(model, skip, smoothing)
+    load["in_flight"] += 1
+    # a cancelled read can still be running on cpu_pool; release waits for it
+    cap_lock = threading.Lock()
+
+    def read(n):
+        with cap_lock:
+            return read_frames(cap, n)
+
+    async def stream():
+        try:
+            index = 0
+            while True:
+                frames = await run_cpu(read, VIDEO_BATCH_SIZE)
+                if not frames:
+                    break
+                results = await run_cpu(masker.process, frames)
+                for line in await run_cpu(frame_results, index, results, threshold, min_area, masks):
+                    yield line + "\n"
+                index += len(frames)
+            yield json.dumps({"done": True, **masker.stats()}) + "\n"
+        finally:
+            load["in_flight"] -= 1
+            # not awaited: on client disconnect the stream is cancelled, and an
+            # await here would be cancelled too, leaking the capture and temp file
+            with cap_lock:
+                close_video(cap, path)
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
+@app.websocket("/ws/video")
+async def video_socket(
+    ws: WebSocket,
+    threshold: float = 0.5,
+    skip: float = VIDEO_SKIP_THRESHOLD,
+    smoothing: float = VIDEO_SMOOTHING,
+    min_area: int = MIN_AREA,
+    masks: bool = False,
+):
+    """
+    Client sends each frame as one binary message (JPEG/PNG) and a text
+    message "end" when done. Frames that queue up while the model is busy
+    are batched together; results come back as one JSON text per frame.
+    A busy server accepts and closes at once with 1013 (try again later).
+    """
+    if load["in_flight"] >= MAX_IN_FLIGHT:
+        load["rejected"] += 1
+        await ws.accept()
+        await ws.close(code=1013, reason="server busy")
+        return
+
+    load["in_flight"] += 1
+    try:
+        await ws.accept()
+    except BaseException:
+        load["in_flight"] -= 1
+        raise
+    masker = TemporalMasker(model, skip, smoothing)
+    inbox = asyncio.Queue(maxsize=2 * VIDEO_BATCH_SIZE)  # backpressure on the sender
+
+    async def receive():
+        try:
+            while True:
+                msg = await ws.receive()
+                if msg["type"] == "websocket.disconnect" or msg.get("text") == "end":
+                    break
+                if msg.get("bytes") is not None:
+                    await inbox.put(msg["bytes"])
+        finally:
+            await inbox.put(None)
+
+    receiver = asyncio.create_task(receive())
+    index = 0
+    try:
+        finished = False
+        while not finished:
+            chunk = [await inbox.get()]
+            while len(chunk) < VIDEO_BATCH_SIZE and not inbox.empty():
+                chunk.append(inbox.get_nowait())
+            if None in chunk:
+                finished = True
+                chunk = chunk[:chunk.index(None)]
+            if not chunk:
+                continue
+
+            try:
+                frames = await run_cpu(decode_frames, chunk)
+            except ValueError as e:
+                await ws.close(code=1003, reason=str(e))
+                return
+            results = await run_cpu(masker.process, frames)
+            for line in await run_cpu(frame_results, index, results, threshold, min_area, masks):
+                await ws.send_text(line)
+            index += len(frames)
+
+        await ws.send_text(json.dumps({"done": True, **masker.stats()}))
+        await ws.close()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        load["in_flight"] -= 1
+        receiver.cancel()
+
+
+@app.get("/stats")
+def stats():
     return {
-        "mask": StreamingResponse(to_png_bytes(mask), media_type="image/png"),
-        "overlay": StreamingResponse(to_png_bytes(overlay), media_type="image/png"),
-        "bounding_box": StreamingResponse(to_png_bytes(bbox), media_type="image/png"),
-        "heatmap": StreamingResponse(to_png_bytes(heatmap), media_type="image/png"),
-        "combined": StreamingResponse(to_png_bytes(combined), media_type="image/png"),
+        "worker": os.getpid(),  # stats are per process under serve.py
+        "batching": {tta: b.stats() for tta, b in batchers.items()},
+        "load": {**load, "max_in_flight": MAX_IN_FLIGHT},
+        "cascade": cascade_stats,
+        "result_cache": result_cache.stats() if result_cache is not None else None,
+        "prob_cache": prob_cache.stats() if prob_cache is not None else None,
     }
-
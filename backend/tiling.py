@@ -0,0 +1,118 @@
+# backend/tiling.py
+# Sliding-window inference for images much larger than the 352x352 the model
+# was trained at. Tiles are cut at native resolution, batched through the
+# model, and their logits are blended with feathered weights so tile seams
+# don't show. Only one band of tile rows is held in float at a time.
+import numpy as np
+import torch
+import torch.nn.functional as F
+import cv2
+
+from predict import INPUT_SIZE, predict_batch, threshold_map
+
+
+def tile_starts(length, tile, stride):
+    """Tile offsets along one axis; the last tile is flush with the edge."""
+    if length <= tile:
+        return [0]
+    starts = list(range(0, length - tile, stride))
+    starts.append(length - tile)
+    return starts
+
+
+def feather_window(tile, overlap, eps=1e-3):
+    """
+    [tile,tile] weights: 1 in the middle, ramping linearly to ~0 over
+    `overlap` pixels at each edge. Never exactly 0, so image borders (which
+    only one tile covers) still normalize correctly.
+    """
+    if overlap <= 0:
+        return np.ones((tile, tile), dtype=np.float32)
+    i = np.arange(tile, dtype=np.float32) + 0.5
+    ramp = np.minimum(1.0, np.minimum(i, tile - i) / overlap)
+    ramp = np.maximum(ramp, eps)
+    return np.outer(ramp, ramp)
+
+
+def _tile_logits(model, tiles, tile, input_size):
+    """tiles: uint8 [B,tile,tile,3] -> float32 logits [B,tile,tile]"""
+    if tile != input_size:
+        tiles = np.stack([
+            cv2.resize(t, (input_size, input_size), interpolation=cv2.INTER_AREA)
+            for t in tiles
+        ])
+    with torch.no_grad():
+        prob = predict_batch(model, tiles)
+        logits = torch.logit(prob, eps=1e-6)
+        if tile != input_size:
+            logits = F.interpolate(logits, (tile, tile), mode="bilinear", align_corners=False)
+    return logits[:, 0].numpy()
+
+
+def run_tiled_inference(model, img, tile_size=INPUT_SIZE, overlap=64, batch_size=8,
+                        threshold=0.5, input_size=INPUT_SIZE):
+    """
+    img: RGB uint8 [H,W,3] at full resolution
+    tile_size: tile side in source pixels (each tile is resized to input_size)
+    overlap: pixels shared by neighbouring tiles (feathered when blending)
+    returns: uint8 0/255 mask [H,W]
+    """
+    prob = run_tiled_prob(model, img, tile_size, overlap, batch_size, input_size)
+    return threshold_map(prob, threshold)
+
+
+def run_tiled_prob(model, img, tile_size=INPUT_SIZE, overlap=64, batch_size=8,
+                   input_size=INPUT_SIZE):
+    """
+    Same as run_tiled_inference, without the threshold.
+    returns: uint8 0..255 probability map [H,W] (see predict.prob_map)
+    """
+    model.eval()
+    if overlap >= tile_size:
+        raise ValueError("overlap must be smaller than tile_size")
+
+    H, W = img.shape[:2]
+    # images smaller than one tile are zero-padded up to it
+    if H < tile_size or W < tile_size:
+        padded = np.zeros((max(H, tile_size), max(W, tile_size), 3), dtype=np.uint8)
+        padded[:H, :W] = img
+        img = padded
+    PH, PW = img.shape[:2]
+
+    stride = tile_size - overlap
+    ys = tile_starts(PH, tile_size, stride)
+    xs = tile_starts(PW, tile_size, stride)
+    window = feather_window(tile_size, overlap)
+
+    prob = np.zeros((H, W), dtype=np.uint8)
+    # band accumulators: rows [band_top, band_top + tile_size) of the image
+    acc = np.zeros((tile_size, PW), dtype=np.float32)
+    wsum = np.zeros((tile_size, PW), dtype=np.float32)
+    band_top = 0
+
+    for r, y in enumerate(ys):
+        # shift the band down to start at this row of tiles
+        shift = y - band_top
+        if shift:
+            acc[:-shift] = acc[shift:]
+            acc[-shift:] = 0
+            wsum[:-shift] = wsum[shift:]
+            wsum[-shift:] = 0
+            band_top = y
+
+        for i in range(0, len(xs), batch_size):
+            chunk = xs[i:i + batch_size]
+            tiles = np.stack([img[y:y + tile_size, x:x + tile_size] for x in chunk])
+            for x, logit in zip(chunk, _tile_logits(model, tiles, tile_size, input_size)):
+                acc[:, x:x + tile_size] += logit * window
+                wsum[:, x:x + tile_size] += window
+
+        # rows above the next tile row will not receive any more tiles
+        done = (ys[r + 1] if r + 1 < len(ys) else PH) - band_top
+        rows = slice(band_top, min(band_top + done, H))
+        n = rows.stop - rows.start
+        if n > 0:
+            blended = acc[:n, :W] / wsum[:n, :W]
+            prob[rows] = np.rint(255 / (1 + np.exp(-blended)))
+
+    return prob
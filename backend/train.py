@@ -1,91 +1,284 @@
 # backend/train.py
 import os
+import time
+import argparse
+from functools import partial
 import torch
 from torch.utils.data import DataLoader
 from torch import optim
 import torch.nn.functional as F
 from tqdm import tqdm
 from dataset import COD10KDataset
-from models.sinet import get_model
+from feature_cache import build_feature_cache, cache_size_mb, FeatureDataset
+from models.backbones import BACKBONES, DEFAULT_BACKBONE
+from models.sinet import get_model, load_model, model_checkpoint
 
 # Use CPU
 DEVICE = torch.device("cpu")
 
-# Optional: slightly limit PyTorch threads so it doesn’t thrash your CPU
-torch.set_num_threads(4)
-
 DATASET_PATH = r"D:\Camo spotter 3\Camo-spotter-2\datasets\COD10K_subset"
 
 IMG_DIR = os.path.join(DATASET_PATH, "Images")
 GT_DIR = os.path.join(DATASET_PATH, "GT")
 
+# Decoded/resized samples are cached here on first run (rebuilt automatically
+# when the dataset changes). Set to None to decode from JPEG/PNG every epoch.
+CACHE_DIR = os.path.join(DATASET_PATH, "cache_352")
+
+# --cache-features: frozen backbone outputs x1..x4 are computed once and
+# stored here, then only the RF/PDC heads are trained
+FEATURE_CACHE_DIR = os.path.join(DATASET_PATH, "features_352")
+FEATURE_FP16 = True
+
 WEIGHTS_DIR = "weights"
 os.makedirs(WEIGHTS_DIR, exist_ok=True)
 SAVE_PATH = os.path.join(WEIGHTS_DIR, "sinet.pth")
 
+# --distill TEACHER: the student also learns the teacher's Ci / Cs maps
+# (soft targets); loss = (1 - DISTILL_ALPHA) * GT loss + DISTILL_ALPHA * teacher loss
+DISTILL_ALPHA = 0.5
+
 EPOCHS = 5           # start with 5; you can bump to 10 later if okay
 BATCH_SIZE = 3       # safe on CPU
 LR = 1e-4            # learning rate
 MAX_SAMPLES = 300    # use 300 images for faster training; increase if you want
 
+# Data loading (tune per machine with --bench loader / --bench train)
+NUM_WORKERS = 2          # 0 = decode in the main process
+PREFETCH_FACTOR = 2      # batches queued ahead per worker
+PERSISTENT_WORKERS = True
+# Total CPU threads to use; split between loader workers and torch compute
+# so they don't oversubscribe the cores
+THREAD_BUDGET = os.cpu_count() or 1
+
 
 def bce_loss(pred, gt):
     return F.binary_cross_entropy(pred, gt)
 
 
-def train():
-    print("📌 Loading dataset...")
-    ds = COD10KDataset(IMG_DIR, GT_DIR, target_size=352, max_samples=MAX_SAMPLES)
-    loader = DataLoader(
+def split_threads(num_workers, budget=THREAD_BUDGET):
+    """
+    Each loader worker gets one thread; torch compute in the main process
+    gets the rest. Returns the number of compute threads.
+    """
+    compute = max(1, budget - num_workers)
+    torch.set_num_threads(compute)
+    return compute
+
+
+def _worker_init(worker_id):
+    torch.set_num_threads(1)
+
+
+def make_loader(ds, batch_size=BATCH_SIZE, num_workers=NUM_WORKERS):
+    # workers fetch whole batches via COD10KDataset.__getitems__
+    extra = {}
+    if num_workers > 0:
+        extra = dict(
+            persistent_workers=PERSISTENT_WORKERS,
+            prefetch_factor=PREFETCH_FACTOR,
+            worker_init_fn=_worker_init,
+        )
+
+    return DataLoader(
         ds,
-        batch_size=BATCH_SIZE,
+        batch_size=batch_size,
         shuffle=True,
-        num_workers=0,     # you can try 2 or 4 if your CPU handles it
-        pin_memory=False
+        num_workers=num_workers,
+        pin_memory=DEVICE.type == "cuda",
+        **extra
     )
 
+
+def compute_loss(Ci, Cs, mask):
+    # Resize GT to match output, just in case
+    mask_ci = F.interpolate(mask, size=Ci.shape[-2:], mode="nearest")
+    mask_cs = F.interpolate(mask, size=Cs.shape[-2:], mode="nearest")
+
+    loss_ci = bce_loss(Ci, mask_ci)
+    loss_cs = bce_loss(Cs, mask_cs)
+
+    return loss_ci + 0.5 * loss_cs
+
+
+def distill_loss(Ci, Cs, Ci_t, Cs_t):
+    # teacher probabilities as soft BCE targets, weighted like compute_loss
+    return bce_loss(Ci, Ci_t) + 0.5 * bce_loss(Cs, Cs_t)
+
+
+def save_path_for(backbone):
+    if backbone == DEFAULT_BACKBONE:
+        return SAVE_PATH
+    return os.path.join(WEIGHTS_DIR, f"sinet_{backbone}.pth")
+
+
+def train_step(model, optimizer, img, mask, teacher=None, alpha=DISTILL_ALPHA):
+    img = img.to(DEVICE)      # [B,3,H,W]
+    mask = mask.to(DEVICE)    # [B,1,H,W]
+
+    optimizer.zero_grad()
+
+    Ci, Cs = model(img)       # both [B,1,H,W] now
+    loss = compute_loss(Ci, Cs, mask)
+    if teacher is not None:
+        with torch.no_grad():
+            Ci_t, Cs_t = teacher(img)
+        loss = (1 - alpha) * loss + alpha * distill_loss(Ci, Cs, Ci_t, Cs_t)
+
+    loss.backward()
+    optimizer.step()
+    return loss.item()
+
+
+def head_step(model, optimizer, feats, mask):
+    """Same as train_step, starting from cached backbone features."""
+    feats = [f.to(DEVICE) for f in feats]
+    mask = mask.to(DEVICE)
+
+    optimizer.zero_grad()
+
+    Ci, Cs = model.heads(feats, out_size=mask.shape[-2:])
+    loss = compute_loss(Ci, Cs, mask)
+
+    loss.backward()
+    optimizer.step()
+    return loss.item()
+
+
+def load_features(model, ds):
+    print("📌 Building / checking feature cache...")
+    t0 = time.perf_counter()
+    build_feature_cache(model, ds, FEATURE_CACHE_DIR, fp16=FEATURE_FP16)
+    print(f"💾 Feature cache: {cache_size_mb(FEATURE_CACHE_DIR):.0f} MB "
+          f"({time.perf_counter() - t0:.1f}s)")
+    return FeatureDataset(FEATURE_CACHE_DIR)
+
+
+def train(num_workers=NUM_WORKERS, batch_size=BATCH_SIZE, cached_features=False,
+          backbone=DEFAULT_BACKBONE, teacher_path=None, alpha=DISTILL_ALPHA, save_path=None):
+    """
+    teacher_path: trained SINet checkpoint (any backbone) to distill from
+    save_path: defaults to weights/sinet.pth, or weights/sinet_<backbone>.pth
+    """
+    save_path = save_path or save_path_for(backbone)
+    threads = split_threads(num_workers)
+    print(f"🧵 {num_workers} loader workers, {threads} compute threads")
+
+    print("📌 Loading dataset...")
+    ds = COD10KDataset(IMG_DIR, GT_DIR, target_size=352, max_samples=MAX_SAMPLES,
+                       cache_dir=CACHE_DIR)
+
     print(f"✅ Dataset size: {len(ds)} images")
-    print("📌 Initializing model...")
-    model = get_model(device=DEVICE)
+    print(f"📌 Initializing model ({backbone})...")
+    model = get_model(device=DEVICE, backbone=backbone)
     optimizer = optim.Adam(filter(lambda p: p.requires_grad, model.parameters()), lr=LR)
 
+    step = train_step
+    if cached_features:
+        ds = load_features(model, ds)
+        step = head_step
+    if teacher_path:
+        teacher = load_model(teacher_path, device=DEVICE)  # backbone from its checkpoint
+        for p in teacher.parameters():
+            p.requires_grad = False
+        print(f"🎓 Distilling from {teacher_path} ({teacher.backbone_name}, alpha={alpha})")
+        step = partial(train_step, teacher=teacher, alpha=alpha)
+    loader = make_loader(ds, batch_size, num_workers)
+
     print("🚀 Training started...\n")
     for epoch in range(1, EPOCHS + 1):
         model.train()
         total_loss = 0.0
+        t0 = time.perf_counter()
 
         pbar = tqdm(loader, total=len(loader), desc=f"Epoch {epoch}/{EPOCHS}")
-        for img, mask in pbar:
-            img = img.to(DEVICE)      # [B,3,H,W]
-            mask = mask.to(DEVICE)    # [B,1,H,W]
+        for x, mask in pbar:
+            loss = step(model, optimizer, x, mask)
 
-            optimizer.zero_grad()
+            total_loss += loss
+            pbar.set_postfix({"loss": f"{loss:.4f}"})
 
-            Ci, Cs = model(img)       # both [B,1,H,W] now
-
-            # Resize GT to match output, just in case
-            mask_ci = F.interpolate(mask, size=Ci.shape[-2:], mode="nearest")
-            mask_cs = F.interpolate(mask, size=Cs.shape[-2:], mode="nearest")
+        avg_loss = total_loss / len(loader)
+        print(f"✅ Epoch {epoch} complete. Avg Loss = {avg_loss:.4f} "
+              f"({time.perf_counter() - t0:.1f}s)")
 
-            loss_ci = bce_loss(Ci, mask_ci)
-            loss_cs = bce_loss(Cs, mask_cs)
+        torch.save(model_checkpoint(model), save_path)
 
-            loss = loss_ci + 0.5 * loss_cs
+    print("\n🎉 Training finished!")
+    print(f"💾 Model saved to: {save_path}")
 
-            loss.backward()
-            optimizer.step()
 
-            total_loss += loss.item()
-            pbar.set_postfix({"loss": f"{loss.item():.4f}"})
+def bench(mode, num_workers=NUM_WORKERS, batch_size=BATCH_SIZE, n_batches=20,
+          backbone=DEFAULT_BACKBONE):
+    """
+    Reports images/sec for the loader alone ("loader"), for full training
+    steps ("train") or for head-only steps on cached features ("features").
+    Worker start-up and the first batch are excluded.
+    returns: images/sec
+    """
+    threads = split_threads(num_workers)
+    ds = COD10KDataset(IMG_DIR, GT_DIR, target_size=352, max_samples=MAX_SAMPLES,
+                       cache_dir=CACHE_DIR)
 
-        avg_loss = total_loss / len(loader)
-        print(f"✅ Epoch {epoch} complete. Avg Loss = {avg_loss:.4f}")
+    if mode in ("train", "features"):
+        model = get_model(device=DEVICE, backbone=backbone)
+        model.train()
+        optimizer = optim.Adam(filter(lambda p: p.requires_grad, model.parameters()), lr=LR)
+    if mode == "features":
+        ds = load_features(model, ds)
+    loader = make_loader(ds, batch_size, num_workers)
 
-        torch.save({"state_dict": model.state_dict()}, SAVE_PATH)
+    it = iter(loader)
+    next(it)
+    images = 0
+    t0 = time.perf_counter()
+    for _ in range(n_batches):
+        try:
+            x, mask = next(it)
+        except StopIteration:
+            it = iter(loader)
+            x, mask = next(it)
+        if mode == "train":
+            train_step(model, optimizer, x, mask)
+        elif mode == "features":
+            head_step(model, optimizer, x, mask)
+        images += mask.shape[0]
+    elapsed = time.perf_counter() - t0
 
-    print("\n🎉 Training finished!")
-    print(f"💾 Model saved to: {SAVE_PATH}")
+    rate = images / elapsed
+    print(f"⏱️ {mode}: workers={num_workers} threads={threads} batch={batch_size} "
+          f"-> {rate:.1f} images/sec")
+    return rate
 
 
 if __name__ == "__main__":
-    train()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=NUM_WORKERS)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--cache-features", action="store_true",
+                        help="train only the RF/PDC heads from cached backbone features")
+    parser.add_argument("--backbone", choices=list(BACKBONES), default=DEFAULT_BACKBONE)
+    parser.add_argument("--distill", metavar="TEACHER",
+                        help="trained checkpoint whose Ci/Cs maps are used as soft targets")
+    parser.add_argument("--distill-alpha", type=float, default=DISTILL_ALPHA,
+                        help="weight of the teacher loss (the GT loss gets 1 - alpha)")
+    parser.add_argument("--out", help="checkpoint path (default: weights/sinet[_<backbone>].pth)")
+    parser.add_argument("--bench", choices=["loader", "train", "features"],
+                        help="measure throughput instead of training")
+    parser.add_argument("--bench-batches", type=int, default=20)
+    args = parser.parse_args()
+
+    if args.bench == "features":
+        full = bench("train", args.workers, args.batch_size, args.bench_batches, args.backbone)
+        heads = bench("features", args.workers, args.batch_size, args.bench_batches, args.backbone)
+        print(f"🚀 Feature caching speedup: {heads / full:.1f}x per training step")
+    elif args.bench:
+        bench(args.bench, args.workers, args.batch_size, args.bench_batches, args.backbone)
+    else:
+        if args.distill and args.cache_features:
+            parser.error("--distill needs images for the teacher; it can't use --cache-features")
+        out = args.out or save_path_for(args.backbone)
+        if args.distill and os.path.abspath(out) == os.path.abspath(args.distill):
+            parser.error("the student would overwrite the teacher checkpoint; pass --out")
+        train(args.workers, args.batch_size, args.cache_features,
+              args.backbone, args.distill, args.distill_alpha, out)
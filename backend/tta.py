@@ -0,0 +1,59 @@
+# backend/tta.py
+# Test-time augmentation: horizontal flip and multi-scale views of each
+# letterboxed image are stacked into ONE batch, run in a single forward, and
+# merged back in probability space (mean) before thresholding.
+import torch
+import torch.nn.functional as F
+
+from utils import normalize_batch
+
+TTA_PRESETS = {
+    "none": {"scales": [1.0], "flip": False},
+    "flip": {"scales": [1.0], "flip": True},
+    "scales": {"scales": [0.75, 1.0, 1.25], "flip": False},
+    "full": {"scales": [0.75, 1.0, 1.25], "flip": True},
+}
+
+
+def _view_size(size, scale, multiple=32):
+    # keep sizes a multiple of the backbone stride so features align
+    return max(multiple, int(round(size * scale / multiple)) * multiple)
+
+
+def tta_predict_batch(model, batch, preset="none"):
+    """
+    batch: uint8 [B,S,S,3] letterboxed images (see predict.preprocess)
+    preset: key of TTA_PRESETS
+    returns: merged Ci probabilities [B,1,S,S]
+    """
+    cfg = TTA_PRESETS[preset]
+    x = normalize_batch(batch)  # [B,3,S,S]
+    B, _, S, _ = x.shape
+
+    sizes = [_view_size(S, s) for s in cfg["scales"]]
+    canvas = max(sizes)
+
+    # every view is zero-padded (= mean colour after normalization) to the
+    # largest scale so all of them fit in one tensor
+    views = []
+    for size in sizes:
+        v = x if size == S else F.interpolate(x, (size, size), mode="bilinear", align_corners=False)
+        views.append(F.pad(v, (0, canvas - size, 0, canvas - size)))
+        if cfg["flip"]:
+            views.append(F.pad(v.flip(-1), (0, canvas - size, 0, canvas - size)))
+
+    out = model.predict(torch.cat(views))  # [V*B,1,canvas,canvas]
+
+    merged = torch.zeros(B, 1, S, S)
+    k = 0
+    for size in sizes:
+        for flipped in ([False, True] if cfg["flip"] else [False]):
+            p = out[k * B:(k + 1) * B, :, :size, :size]
+            if flipped:
+                p = p.flip(-1)
+            if size != S:
+                p = F.interpolate(p, (S, S), mode="bilinear", align_corners=False)
+            merged += p
+            k += 1
+
+    return merged / k
@@ -1,53 +1,103 @@
 # backend/utils.py
 import io
+import cv2
 import numpy as np
-from PIL import Image
 import torch
-import torchvision.transforms as T
-
-# transforms for input image
-def preprocess_image_pil(pil_image, target_size=352):
-    # convert to RGB, resize maintaining aspect ratio and pad to square target
-    img = pil_image.convert("RGB")
-    # Resize while preserving aspect ratio to have max side = target_size
-    w, h = img.size
+from PIL import Image, ImageOps
+
+IMAGENET_MEAN = [0.485, 0.456, 0.406]
+IMAGENET_STD = [0.229, 0.224, 0.225]
+
+_MEAN = torch.tensor(IMAGENET_MEAN).view(1, 3, 1, 1) * 255
+_STD = torch.tensor(IMAGENET_STD).view(1, 3, 1, 1) * 255
+
+EXIF_ORIENTATION = 0x0112
+
+
+# -----------------------------------------
+#   Decoding
+# -----------------------------------------
+def decode_image(fp, target_size=None):
+    """
+    Decodes an image file (path or file object) to an upright RGB uint8
+    array, with its EXIF orientation applied.
+
+    target_size: if set, a JPEG is decoded at the smallest libjpeg scale
+        (1/2, 1/4 or 1/8; downscaled in the DCT domain, so the full-size
+        bitmap never exists) whose longer side is still >= target_size.
+        Enough for the model input, not for visuals drawn on the original.
+    returns: uint8 [h,w,3], (W, H) of the full-resolution upright image
+    """
+    with Image.open(fp) as im:
+        w, h = im.size
+        if target_size:
+            scale = target_size / max(w, h)
+            im.draft("RGB", (max(1, round(w * scale)), max(1, round(h * scale))))
+        if im.getexif().get(EXIF_ORIENTATION, 1) in (5, 6, 7, 8):  # transposed / rotated 90
+            w, h = h, w
+        # no-op copies add up at 12-24 MP: transpose in place, convert only if needed
+        ImageOps.exif_transpose(im, in_place=True)
+        if im.mode != "RGB":
+            im = im.convert("RGB")
+        return np.asarray(im), (w, h)
+
+
+# -----------------------------------------
+#   Letterbox pre/post-processing
+# -----------------------------------------
+def letterbox(img, target_size=352, orig_size=None):
+    """
+    Resizes an RGB uint8 array so its longer side is target_size (aspect
+    preserved) and pads it with black to target_size x target_size.
+
+    img: uint8 [H,W,3]
+    orig_size: (W, H) unletterbox should restore, if img is a reduced decode
+    returns: uint8 [S,S,3], meta (needed by unletterbox)
+    """
+    h, w = img.shape[:2]
     scale = target_size / max(w, h)
-    new_w, new_h = int(w * scale), int(h * scale)
-    img_resized = img.resize((new_w, new_h), resample=Image.BILINEAR)
+    new_w, new_h = max(1, round(w * scale)), max(1, round(h * scale))
+
+    # INTER_AREA avoids aliasing when shrinking, INTER_LINEAR when enlarging
+    interp = cv2.INTER_AREA if scale < 1 else cv2.INTER_LINEAR
+    resized = cv2.resize(img, (new_w, new_h), interpolation=interp)
 
-    # paste on black background to make target_size x target_size
-    background = Image.new("RGB", (target_size, target_size), (0, 0, 0))
     left = (target_size - new_w) // 2
     top = (target_size - new_h) // 2
-    background.paste(img_resized, (left, top))
-
-    # to tensor and normalize (imagenet)
-    transform = T.Compose([
-        T.ToTensor(),
-        T.Normalize(mean=[0.485, 0.456, 0.406],
-                    std=[0.229, 0.224, 0.225]),
-    ])
-    tensor = transform(background).unsqueeze(0)  # [1,3,H,W]
-    meta = {"orig_size": (w, h), "paste": (left, top, new_w, new_h), "target": target_size}
-    return tensor, meta
-
-def postprocess_mask(mask_tensor, meta, threshold=0.5):
-    # mask_tensor: [1,1,H,W] values 0..1
-    import numpy as np
-    from PIL import Image
-    mask = mask_tensor.squeeze().cpu().numpy()
-    # crop back to original image area
+    canvas = np.zeros((target_size, target_size, 3), dtype=np.uint8)
+    canvas[top:top + new_h, left:left + new_w] = resized
+
+    meta = {"orig_size": orig_size or (w, h), "paste": (left, top, new_w, new_h), "target": target_size}
+    return canvas, meta
+
+
+def normalize_batch(batch):
+    """
+    batch: uint8 [B,S,S,3] (numpy or torch)
+    returns: float32 [B,3,S,S] normalized with ImageNet stats
+    """
+    if isinstance(batch, np.ndarray):
+        batch = torch.from_numpy(batch)
+    x = batch.permute(0, 3, 1, 2).float()
+    return (x - _MEAN) / _STD
+
+
+def unletterbox(prob, meta):
+    """
+    Crops the letterboxed region out of a model output and resizes it back
+    to the original image size.
+
+    prob: [S,S] (or [1,1,S,S]) map, tensor or array
+    returns: float32 [H,W] at the original resolution
+    """
+    if isinstance(prob, torch.Tensor):
+        prob = prob.detach().cpu().numpy()
+    prob = np.asarray(prob, dtype=np.float32).reshape(prob.shape[-2:])
+
     left, top, new_w, new_h = meta["paste"]
-    target = meta["target"]
-    # crop the center region corresponding to the resized image
-    crop = mask[top:top+new_h, left:left+new_w]
-    # resize crop to original size
-    orig_w, orig_h = meta["orig_size"]
-    crop_img = Image.fromarray((crop * 255).astype("uint8")).resize((orig_w, orig_h), Image.BILINEAR)
-    # binary mask
-    bin_mask = (np.array(crop_img) >= int(threshold * 255)).astype("uint8") * 255
-    pil_mask = Image.fromarray(bin_mask).convert("L")
-    return pil_mask
+    crop = prob[top:top + new_h, left:left + new_w]
+    return cv2.resize(crop, meta["orig_size"], interpolation=cv2.INTER_LINEAR)
+
 
 def mask_to_bytes(pil_mask, fmt="PNG"):
     bio = io.BytesIO()
@@ -0,0 +1,111 @@
+# backend/video.py
+# Frame-stream inference with temporal reuse. Frames arrive in order (from a
+# decoded video file or a WebSocket) and are fed through TemporalMasker in
+# small chunks:
+#   - a frame whose low-res grayscale thumbnail barely differs from that of
+#     the last frame that went through the model reuses that frame's Ci
+#     instead of running the model again
+#   - the remaining frames of a chunk go through the model as one batch
+#   - Ci is smoothed over time with an exponential moving average, at model
+#     resolution (before un-letterboxing), so masks don't flicker
+import cv2
+import numpy as np
+import torch
+
+from predict import preprocess, predict_batch, prob_map
+
+DIFF_SIZE = 64    # side of the grayscale thumbnail frames are compared on
+PIXEL_DELTA = 16  # grey levels; smaller thumbnail changes count as noise
+
+
+def frame_signature(frame, size=DIFF_SIZE):
+    gray = cv2.cvtColor(frame, cv2.COLOR_RGB2GRAY)
+    return cv2.resize(gray, (size, size), interpolation=cv2.INTER_AREA).astype(np.int16)
+
+
+class TemporalMasker:
+    """
+    Stateful per-stream processor; one instance per video / connection.
+
+    skip_threshold: fraction of thumbnail pixels that changed by more than
+        PIXEL_DELTA below which the previous Ci is reused; 0 = run every
+        frame. A fraction, not a mean difference, so a small animal moving
+        against a static background still triggers a new forward.
+    smoothing: EMA weight of the newest Ci (1.0 = no smoothing)
+    """
+    def __init__(self, model, skip_threshold=0.005, smoothing=0.6):
+        self.model = model
+        self.skip_threshold = skip_threshold
+        self.smoothing = smoothing
+        self.frames = 0
+        self.inferred = 0
+
+        self._shape = None
+        self._ref_sig = None  # thumbnail of the last frame that went through the model
+        self._ref_ci = None   # its Ci, letterboxed [1,S,S]
+        self._meta = None     # its letterbox meta
+        self._ema = None
+
+    def process(self, frames):
+        """
+        frames: list of RGB uint8 [H,W,3], in stream order
+        returns: list of (uint8 probability map [H,W], reused) per frame
+        """
+        plan = []  # (meta, letterboxed or None if reused, geometry changed)
+        for frame in frames:
+            reset = frame.shape != self._shape  # nothing to reuse or smooth with
+            if reset:
+                self._shape = frame.shape
+                self._ref_sig = None
+            sig = frame_signature(frame)
+            reuse = (
+                self._ref_sig is not None
+                and (np.abs(sig - self._ref_sig) > PIXEL_DELTA).mean() < self.skip_threshold
+            )
+            if reuse:
+                # same geometry as the reference frame, so the same letterbox
+                plan.append((self._meta, None, reset))
+            else:
+                self._ref_sig = sig  # later frames, even in this chunk, compare to this one
+                lb, self._meta = preprocess(frame)
+                plan.append((self._meta, lb, reset))
+
+        to_run = [lb for _, lb, _ in plan if lb is not None]
+        cis = iter([])
+        if to_run:
+            with torch.no_grad():
+                cis = iter(predict_batch(self.model, np.stack(to_run)))
+            self.inferred += len(to_run)
+
+        out = []
+        for meta, lb, reset in plan:
+            if reset:
+                self._ema = None
+            reused = lb is None
+            if not reused:
+                self._ref_ci = next(cis)
+            ci = self._ref_ci
+            self._ema = ci if self._ema is None else (
+                self.smoothing * ci + (1 - self.smoothing) * self._ema
+            )
+            out.append((prob_map(self._ema, meta), reused))
+        self.frames += len(out)
+        return out
+
+    def stats(self):
+        return {
+            "frames": self.frames,
+            "inferred": self.inferred,
+            "reused": self.frames - self.inferred,
+        }
+
+
+def read_frames(cap, n):
+    """Up to n RGB frames from an open cv2.VideoCapture (fewer at the end)."""
+    frames = []
+    while len(frames) < n:
+        ok, bgr = cap.read()
+        if not ok:
+            break
+        frames.append(cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB))
+    return frames